@@ -36,16 +36,27 @@ def optimize_database():
                 "CREATE INDEX IF NOT EXISTS idx_room_bookings_customer_id ON room_bookings(customer_id)",
                 "CREATE INDEX IF NOT EXISTS idx_room_bookings_dates ON room_bookings(rental_start_date, rental_end_date)",
                 "CREATE INDEX IF NOT EXISTS idx_room_bookings_status ON room_bookings(status)",
+                "CREATE INDEX IF NOT EXISTS idx_room_bookings_conflict ON room_bookings(room_id, status, rental_start_date, rental_end_date)",
+                "CREATE INDEX IF NOT EXISTS idx_room_bookings_customer_latest ON room_bookings(customer_id, rental_start_date, booking_id)",
                 
                 # Alert indexes
                 "CREATE INDEX IF NOT EXISTS idx_alerts_contract_id ON alerts(contract_id)",
                 "CREATE INDEX IF NOT EXISTS idx_alerts_date ON alerts(alert_date)",
                 "CREATE INDEX IF NOT EXISTS idx_alerts_sent ON alerts(is_sent)",
+                "CREATE INDEX IF NOT EXISTS idx_alerts_sent_date ON alerts(is_sent, alert_date)",
                 
                 # Room alert indexes
                 "CREATE INDEX IF NOT EXISTS idx_room_alerts_booking_id ON room_alerts(booking_id)",
                 "CREATE INDEX IF NOT EXISTS idx_room_alerts_date ON room_alerts(alert_date)",
                 "CREATE INDEX IF NOT EXISTS idx_room_alerts_sent ON room_alerts(is_sent)",
+                "CREATE INDEX IF NOT EXISTS idx_room_alerts_sent_date ON room_alerts(is_sent, alert_date)",
+                
+                # Revenue rollup refresh indexes
+                "CREATE INDEX IF NOT EXISTS idx_payment_requests_issue_date ON payment_requests(issue_date)",
+                "CREATE INDEX IF NOT EXISTS idx_payments_paid_at ON payments(paid_at)",
+                
+                # Amenity filter: rooms offering an amenity
+                "CREATE INDEX IF NOT EXISTS idx_room_amenities_amenity_id ON room_amenities(amenity_id)",
             ]
             
             created_count = 0
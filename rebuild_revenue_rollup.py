@@ -0,0 +1,22 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.jobs.revenue import rebuild_revenue_rollup
+
+def main():
+    """Recompute revenue_monthly from contracts, payment requests and payments"""
+    print("📈 REVENUE ROLLUP REBUILD")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            rows = rebuild_revenue_rollup()
+            print(f"✅ {rows} monthly rows written")
+        except Exception as e:
+            print(f"❌ Rebuild failed: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+import os
+import time
+import argparse
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.jobs.delivery import run_delivery_cycle
+from src.jobs.transports import transport_from_config
+
+def main():
+    """Background worker that delivers due payment and room alerts as customer digests"""
+    parser = argparse.ArgumentParser(description='Deliver due alerts through the configured transport')
+    parser.add_argument('--once', action='store_true', help='Run a single cycle and exit')
+    parser.add_argument('--interval', type=int, default=60, help='Seconds between cycles (default: 60)')
+    args = parser.parse_args()
+
+    with app.app_context():
+        transport = transport_from_config(app.config)
+        sender = app.config.get('ALERT_SENDER', 'no-reply@campusk.vn')
+        lookback_days = app.config.get('ALERT_LOOKBACK_DAYS', 7)
+        no_email = 0
+        while True:
+            try:
+                result = run_delivery_cycle(transport, sender, lookback_days=lookback_days)
+                if result['digests_created'] or result['sent'] or result['failed']:
+                    print(f"📨 {result['digests_created']} digests queued, "
+                          f"{result['sent']} sent, {result['failed']} failed")
+                if result['skipped_stale']:
+                    print(f"⏭️  {result['skipped_stale']} alerts older than {lookback_days} days skipped")
+                if result['no_email'] != no_email:
+                    no_email = result['no_email']
+                    print(f"⚠️  {no_email} due alerts waiting for a customer email address")
+            except Exception as e:
+                print(f"❌ Alert delivery failed: {e}")
+            if args.once:
+                break
+            time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
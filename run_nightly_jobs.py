@@ -0,0 +1,50 @@
+import sys
+import os
+import argparse
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.jobs.alerts import run_alert_generation
+from src.jobs.bookings import run_booking_maintenance
+
+def _ids(ids, limit=20):
+    shown = ', '.join(str(i) for i in ids[:limit])
+    return shown + (f' ... (+{len(ids) - limit})' if len(ids) > limit else '')
+
+def main():
+    """Nightly maintenance jobs, meant to be run from cron"""
+    parser = argparse.ArgumentParser(description='Run nightly maintenance jobs')
+    parser.add_argument('--since', help='Backfill alerts dated on or after YYYY-MM-DD (default: today)')
+    args = parser.parse_args()
+    since = datetime.strptime(args.since, '%Y-%m-%d').date() if args.since else None
+
+    print("🌙 NIGHTLY JOBS")
+    print("=" * 50)
+
+    with app.app_context():
+        try:
+            result = run_alert_generation(since)
+            for group, counts in result.items():
+                print(f"✅ {group}: {sum(counts.values())} created")
+                for alert_type, count in counts.items():
+                    print(f"   {alert_type:32}: {count}")
+        except Exception as e:
+            print(f"❌ Alert generation failed: {e}")
+            sys.exit(1)
+
+        try:
+            result = run_booking_maintenance()
+            print(f"✅ bookings expired: {len(result['expired_bookings'])}")
+            if result['expired_bookings']:
+                print(f"   booking ids: {_ids(result['expired_bookings'])}")
+            for label, key in (('rooms marked available', 'rooms_freed'), ('rooms marked unavailable', 'rooms_unavailable')):
+                print(f"✅ {label}: {len(result[key])}")
+                if result[key]:
+                    print(f"   room ids: {_ids(result[key])}")
+        except Exception as e:
+            print(f"❌ Booking maintenance failed: {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from decimal import Decimal
+
+from sqlalchemy import func
+
+
+def sum_cents(column):
+    """SUM a money column as integer cents so the total is exact whatever the backend stores"""
+    return func.coalesce(func.sum(func.round(func.coalesce(column, 0) * 100)), 0)
+
+
+def cents_to_decimal(cents):
+    """An exact Decimal amount (two places) for a sum_cents() result"""
+    return Decimal(int(cents or 0)).scaleb(-2)
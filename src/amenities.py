@@ -0,0 +1,266 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, insert, delete, exists, func
+
+from src.models.user import db
+from src.models.room import Room, Amenity, room_amenities
+
+_SEPARATORS = re.compile(r'[,;|\n]+')
+
+
+def normalize_amenity(name):
+    """Dictionary key for an amenity: trimmed, single-spaced, lower case"""
+    return ' '.join(str(name).split()).lower()
+
+
+def parse_amenities(value):
+    """[(key, label)] from the legacy Room.amenities text (comma separated or a JSON list)"""
+    if not value:
+        return []
+    text = value.strip()
+    items = None
+    if text.startswith('['):
+        try:
+            items = [item for item in json.loads(text) if item is not None]
+        except ValueError:
+            items = None
+    if items is None:
+        items = _SEPARATORS.split(text)
+    pairs = {}
+    for item in items:
+        label = ' '.join(str(item).split())
+        if label and label.lower() not in pairs:
+            pairs[label.lower()] = label
+    return list(pairs.items())
+
+
+def _amenity_ids(pairs):
+    """Dictionary ids for (key, label) pairs, adding the keys that are new"""
+    if not pairs:
+        return {}
+    found = dict(db.session.execute(
+        select(Amenity.name, Amenity.amenity_id).where(Amenity.name.in_(list(pairs)))
+    ).all())
+    missing = [
+        {'name': key, 'label': label, 'created_at': datetime.utcnow()}
+        for key, label in pairs.items() if key not in found
+    ]
+    if missing:
+        db.session.execute(insert(Amenity), missing)
+        found.update(db.session.execute(
+            select(Amenity.name, Amenity.amenity_id).where(Amenity.name.in_([m['name'] for m in missing]))
+        ).all())
+    return found
+
+
+def sync_room_amenities(amenities_by_room):
+    """Rewrite the room_amenities links of {room_id: amenities text} in the current transaction.
+
+    Returns {room_id: [amenity keys]} for updating the bitmap index after commit.
+    """
+    if not amenities_by_room:
+        return {}
+    db.session.flush()
+    parsed = {room_id: parse_amenities(text) for room_id, text in amenities_by_room.items()}
+    ids = _amenity_ids({key: label for pairs in parsed.values() for key, label in pairs})
+    db.session.execute(delete(room_amenities).where(room_amenities.c.room_id.in_(list(parsed))))
+    links = [
+        {'room_id': room_id, 'amenity_id': ids[key]}
+        for room_id, pairs in parsed.items() for key, _ in pairs
+    ]
+    if links:
+        db.session.execute(insert(room_amenities), links)
+    return {room_id: [key for key, _ in pairs] for room_id, pairs in parsed.items()}
+
+
+def backfill_room_amenities(batch_size=1000, after_room_id=0):
+    """Normalize rooms whose amenities text has no links yet; commits.
+
+    Covers rows written before the relation existed and rooms inserted
+    without the room API (import scripts, data loaders, other processes).
+    """
+    total = 0
+    last_room_id = after_room_id
+    while True:
+        rows = db.session.execute(
+            select(Room.room_id, Room.amenities)
+            .where(
+                Room.room_id > last_room_id,
+                Room.amenities.isnot(None), Room.amenities != '',
+                ~exists().where(room_amenities.c.room_id == Room.room_id)
+            )
+            .order_by(Room.room_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        sync_room_amenities(dict(rows))
+        db.session.commit()
+        total += len(rows)
+        last_room_id = rows[-1][0]
+
+
+class _BranchBitmaps:
+    """Rooms of one branch as bit positions, and one int bitmap per amenity key"""
+
+    __slots__ = ('room_ids', 'positions', 'bitmaps')
+
+    def __init__(self):
+        self.room_ids = []
+        self.positions = {}
+        self.bitmaps = {}
+
+    def set_room(self, room_id, keys):
+        position = self.positions.get(room_id)
+        if position is None:
+            position = self.positions[room_id] = len(self.room_ids)
+            self.room_ids.append(room_id)
+        bit = 1 << position
+        for key in list(self.bitmaps):
+            self.bitmaps[key] &= ~bit
+        for key in keys:
+            self.bitmaps[key] = self.bitmaps.get(key, 0) | bit
+
+    def remove_room(self, room_id):
+        position = self.positions.pop(room_id, None)
+        if position is None:
+            return
+        self.room_ids[position] = None
+        for key in list(self.bitmaps):
+            self.bitmaps[key] &= ~(1 << position)
+
+    def matching(self, keys):
+        bitmap = None
+        for key in keys:
+            bitmap = self.bitmaps.get(key, 0) if bitmap is None else bitmap & self.bitmaps.get(key, 0)
+            if not bitmap:
+                return []
+        matches = []
+        while bitmap:
+            low = bitmap & -bitmap
+            matches.append(self.room_ids[low.bit_length() - 1])
+            bitmap ^= low
+        return matches
+
+
+class AmenityIndex:
+    """In-process per-branch bitmap index over room_amenities.
+
+    "projector AND whiteboard AND window" is an AND of three ints per branch.
+    Room writers in this process update it after commit; max_age bounds how
+    stale it can get when other processes edit rooms.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()  # one backfill + reload at a time
+        self._branches = {}
+        self._room_branch = {}
+        self._max_room_id = 0
+        self._built_monotonic = None
+
+    @staticmethod
+    def _load(after_room_id=0):
+        """[(room_id, branch_id)] and {room_id: [keys]} for rooms after after_room_id"""
+        rooms = db.session.execute(
+            select(Room.room_id, Room.branch_id)
+            .where(Room.room_id > after_room_id)
+            .order_by(Room.branch_id, Room.room_id)
+        ).all()
+        keys_by_room = {}
+        for room_id, key in db.session.execute(
+            select(room_amenities.c.room_id, Amenity.name)
+            .join(Amenity, Amenity.amenity_id == room_amenities.c.amenity_id)
+            .where(room_amenities.c.room_id > after_room_id)
+        ):
+            keys_by_room.setdefault(room_id, []).append(key)
+        return rooms, keys_by_room
+
+    def rebuild(self):
+        """Link any unlinked rooms, then reload every branch bitmap"""
+        with self._refresh_lock:
+            backfill_room_amenities()
+            rooms, keys_by_room = self._load()
+            branches = {}
+            for room_id, branch_id in rooms:
+                branches.setdefault(branch_id, _BranchBitmaps()).set_room(room_id, keys_by_room.get(room_id, ()))
+            with self._lock:
+                self._branches = branches
+                self._room_branch = dict(rooms)
+                self._max_room_id = max((room_id for room_id, _ in rooms), default=0)
+                self._built_monotonic = time.monotonic()
+        return len(rooms)
+
+    def _catch_up(self, max_room_id):
+        """Link and add rooms inserted since the last load (room ids only grow)"""
+        with self._refresh_lock:
+            after_room_id = self._max_room_id
+            if max_room_id <= after_room_id:
+                return
+            backfill_room_amenities(after_room_id=after_room_id)
+            rooms, keys_by_room = self._load(after_room_id)
+            for room_id, branch_id in rooms:
+                self.update_room(room_id, branch_id, keys_by_room.get(room_id, ()))
+            with self._lock:
+                self._max_room_id = max([after_room_id] + [room_id for room_id, _ in rooms])
+
+    def ensure_fresh(self, max_age=None):
+        """Rebuild when older than max_age; otherwise pick up rooms inserted by other writers.
+
+        The new-room check is one max(room_id) lookup. Amenity edits made
+        outside the room API to rooms already loaded wait for the next rebuild.
+        """
+        with self._lock:
+            stale = self._built_monotonic is None or (
+                max_age is not None and time.monotonic() - self._built_monotonic > max_age
+            )
+            known_max = self._max_room_id
+        if stale:
+            self.rebuild()
+            return
+        max_room_id = db.session.scalar(select(func.max(Room.room_id))) or 0
+        if max_room_id > known_max:
+            self._catch_up(max_room_id)
+
+    def update_room(self, room_id, branch_id, keys):
+        with self._lock:
+            if self._built_monotonic is None:
+                return
+            previous = self._room_branch.get(room_id)
+            if previous is not None and previous != branch_id:
+                self._branches[previous].remove_room(room_id)
+            self._branches.setdefault(branch_id, _BranchBitmaps()).set_room(room_id, keys)
+            self._room_branch[room_id] = branch_id
+            self._max_room_id = max(self._max_room_id, room_id)
+
+    def remove_room(self, room_id):
+        with self._lock:
+            branch_id = self._room_branch.pop(room_id, None)
+            if branch_id is not None:
+                self._branches[branch_id].remove_room(room_id)
+
+    def remove_branch(self, branch_id):
+        with self._lock:
+            branch = self._branches.pop(branch_id, None)
+            if branch:
+                for room_id in branch.positions:
+                    self._room_branch.pop(room_id, None)
+
+    def rooms_with(self, keys, branch_id=None):
+        """room_ids having every amenity in keys (normalized), optionally within one branch"""
+        keys = [normalize_amenity(key) for key in keys]
+        with self._lock:
+            if branch_id is not None:
+                branch = self._branches.get(branch_id)
+                return branch.matching(keys) if branch else []
+            matches = []
+            for branch in self._branches.values():
+                matches.extend(branch.matching(keys))
+            return matches
+
+
+amenity_index = AmenityIndex()
@@ -0,0 +1,148 @@
+import threading
+import time
+from bisect import bisect_right, insort
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.room import RoomBooking
+
+# Bookings in these statuses keep a room occupied for their date range
+BLOCKING_STATUSES = ('active',)
+
+
+class RoomIntervals:
+    """One room's blocking bookings as (start, end, booking_id), sorted by start.
+
+    max_end[i] is the latest end date among the first i + 1 intervals, so an
+    overlap test is one bisect even when legacy data holds overlapping bookings.
+    """
+
+    __slots__ = ('intervals', 'starts', 'max_end')
+
+    def __init__(self):
+        self.intervals = []
+        self.starts = []
+        self.max_end = []
+
+    def _reindex(self):
+        self.starts = [start for start, _, _ in self.intervals]
+        self.max_end = []
+        latest = None
+        for _, end, _ in self.intervals:
+            latest = end if latest is None or end > latest else latest
+            self.max_end.append(latest)
+
+    def add(self, start, end, booking_id):
+        insort(self.intervals, (start, end, booking_id))
+        self._reindex()
+
+    def remove(self, booking_id):
+        self.intervals = [i for i in self.intervals if i[2] != booking_id]
+        self._reindex()
+
+    def is_free(self, date_from, date_to):
+        """True when no interval intersects [date_from, date_to] (both inclusive)"""
+        position = bisect_right(self.starts, date_to)
+        return position == 0 or self.max_end[position - 1] < date_from
+
+
+class AvailabilityIndex:
+    """In-process interval index of blocking room bookings, keyed by room_id.
+
+    Only bookings that have not ended when the index is built are loaded;
+    queries for past dates are not supported. Writers in this process keep it
+    current through add_booking()/remove_booking(); max_age bounds how stale it
+    can get when other processes write bookings.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rooms = {}
+        self._booking_rooms = {}
+        self.built_at = None
+        self._built_monotonic = None
+
+    def rebuild(self, today=None):
+        today = today or date.today()
+        rows = db.session.execute(
+            select(RoomBooking.booking_id, RoomBooking.room_id, RoomBooking.rental_start_date, RoomBooking.rental_end_date)
+            .where(RoomBooking.status.in_(BLOCKING_STATUSES), RoomBooking.rental_end_date >= today)
+            .order_by(RoomBooking.room_id, RoomBooking.rental_start_date)
+        ).all()
+        rooms = {}
+        booking_rooms = {}
+        for booking_id, room_id, start, end in rows:
+            room = rooms.get(room_id)
+            if room is None:
+                room = rooms[room_id] = RoomIntervals()
+            room.intervals.append((start, end, booking_id))
+            booking_rooms[booking_id] = room_id
+        for room in rooms.values():
+            room.intervals.sort()
+            room._reindex()
+        with self._lock:
+            self._rooms = rooms
+            self._booking_rooms = booking_rooms
+            self.built_at = datetime.utcnow()
+            self._built_monotonic = time.monotonic()
+        return len(booking_rooms)
+
+    def ensure_fresh(self, max_age=None):
+        """Build on first use, and again once the index is older than max_age seconds"""
+        with self._lock:
+            stale = self._built_monotonic is None or (
+                max_age is not None and time.monotonic() - self._built_monotonic > max_age
+            )
+        if stale:
+            self.rebuild()
+
+    def add_booking(self, booking):
+        """Index (or re-index) a booking after its transaction commits"""
+        with self._lock:
+            if self._built_monotonic is None:
+                return
+            self._remove(booking.booking_id)
+            if booking.status in BLOCKING_STATUSES:
+                room = self._rooms.get(booking.room_id)
+                if room is None:
+                    room = self._rooms[booking.room_id] = RoomIntervals()
+                room.add(booking.rental_start_date, booking.rental_end_date, booking.booking_id)
+                self._booking_rooms[booking.booking_id] = booking.room_id
+
+    def remove_booking(self, booking_id):
+        with self._lock:
+            self._remove(booking_id)
+
+    def remove_room(self, room_id):
+        with self._lock:
+            room = self._rooms.pop(room_id, None)
+            if room:
+                for _, _, booking_id in room.intervals:
+                    self._booking_rooms.pop(booking_id, None)
+
+    def _remove(self, booking_id):
+        room_id = self._booking_rooms.pop(booking_id, None)
+        if room_id is not None and room_id in self._rooms:
+            self._rooms[room_id].remove(booking_id)
+
+    def free_rooms(self, room_ids, date_from, date_to):
+        """The subset of room_ids with no blocking booking in [date_from, date_to], order kept"""
+        with self._lock:
+            rooms = self._rooms
+            return [
+                room_id for room_id in room_ids
+                if room_id not in rooms or rooms[room_id].is_free(date_from, date_to)
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rooms_indexed': len(self._rooms),
+                'bookings_indexed': len(self._booking_rooms),
+                'built_at': self.built_at
+            }
+
+
+availability_index = AvailabilityIndex()
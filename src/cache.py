@@ -0,0 +1,75 @@
+import threading
+import time
+
+
+class TTLCache:
+    """Small in-process cache with per-entry expiry and request coalescing.
+
+    When several threads ask for the same missing key at once, only the first
+    one runs `compute`; the others wait for it and share the result.
+
+    Expired entries are pruned on set() (at most once per ttl), and the
+    entries closest to expiry are evicted beyond max_entries, so caches keyed
+    by free-text input stay bounded.
+    """
+
+    def __init__(self, ttl=10, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._next_prune = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return True, entry[1]
+        return False, None
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            if now >= self._next_prune or len(self._entries) > self.max_entries:
+                self._prune(now)
+
+    def _prune(self, now):
+        """Drop expired entries, then the ones expiring soonest while over max_entries (lock held)"""
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for key in sorted(self._entries, key=lambda k: self._entries[k][0])[:overflow]:
+                del self._entries[key]
+        self._next_prune = now + self.ttl
+
+    def get_or_compute(self, key, compute, ttl=None):
+        hit, value = self.get(key)
+        if hit:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # Another thread may have filled the entry while we waited
+                hit, value = self.get(key)
+                if hit:
+                    return value
+                value = compute()
+                self.set(key, value, ttl)
+                return value
+        finally:
+            with self._lock:
+                # Waiters already hold key_lock; later callers hit the entry or make a new lock
+                if self._key_locks.get(key) is key_lock:
+                    del self._key_locks[key]
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,84 @@
+from datetime import datetime, date
+
+from sqlalchemy import select, insert, exists, literal, func, Date
+
+from src.models.user import db
+from src.models.customer import Contract, Alert
+from src.models.room import RoomBooking, RoomAlert
+from src.routes.customer import PAYMENT_ALERT_PERIODS
+from src.routes.room import ROOM_ALERT_RULES
+
+ALERT_COLUMNS = ['alert_date', 'alert_type', 'is_sent', 'created_at']
+
+
+def _shift(column, days):
+    """SQLite date arithmetic: column +/- days, typed as a Date"""
+    return func.date(column, f'{days:+d} days', type_=Date)
+
+
+def _insert_missing(alert_model, owner_column, owner_fk, alert_type, alert_date, conditions, now):
+    """INSERT ... SELECT every alert of one type that does not exist yet"""
+    already_there = exists().where(
+        owner_fk == owner_column,
+        alert_model.alert_type == alert_type,
+        alert_model.alert_date == alert_date
+    )
+    source = select(
+        owner_column, alert_date, literal(alert_type), literal(False), literal(now)
+    ).where(*conditions, ~already_there)
+    stmt = insert(alert_model).from_select([owner_fk.key] + ALERT_COLUMNS, source)
+    return db.session.execute(stmt).rowcount
+
+
+def generate_missing_payment_alerts(since=None, now=None):
+    """Create every missing contract payment alert dated on or after `since` (default today).
+
+    Idempotent: an alert is only inserted when the contract has no alert of the
+    same type on the same date. Returns {alert_type: rows inserted}.
+    """
+    since = since or date.today()
+    now = now or datetime.utcnow()
+    created = {}
+    for alert_type, days_before in PAYMENT_ALERT_PERIODS:
+        alert_date = _shift(Contract.contract_end_date, -days_before)
+        created[alert_type] = _insert_missing(
+            Alert, Contract.contract_id, Alert.contract_id, alert_type, alert_date,
+            [alert_date >= since], now
+        )
+    return created
+
+
+def generate_missing_room_alerts(since=None, now=None):
+    """Create every missing alert for active room bookings dated on or after `since`.
+
+    Uses the same rules as generate_room_alerts; past-due alert types are also
+    bounded by `since` so a backfill does not flood the table with old alerts.
+    """
+    since = since or date.today()
+    now = now or datetime.utcnow()
+    duration = func.julianday(RoomBooking.rental_end_date) - func.julianday(RoomBooking.rental_start_date)
+    created = {}
+    for alert_type, offset_days, _future_only, max_duration in ROOM_ALERT_RULES:
+        alert_date = _shift(RoomBooking.rental_end_date, offset_days)
+        conditions = [RoomBooking.status == 'active', alert_date >= since]
+        if max_duration is not None:
+            conditions.append(duration <= max_duration)
+        created[alert_type] = _insert_missing(
+            RoomAlert, RoomBooking.booking_id, RoomAlert.booking_id, alert_type, alert_date,
+            conditions, now
+        )
+    return created
+
+
+def run_alert_generation(since=None):
+    """Nightly job: backfill all missing payment and room alerts in one transaction"""
+    try:
+        result = {
+            'payment_alerts': generate_missing_payment_alerts(since),
+            'room_alerts': generate_missing_room_alerts(since)
+        }
+        db.session.commit()
+        return result
+    except Exception:
+        db.session.rollback()
+        raise
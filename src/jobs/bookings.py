@@ -0,0 +1,69 @@
+from datetime import datetime, date
+
+from sqlalchemy import update, exists, not_, and_
+
+from src.models.user import db
+from src.models.room import Room, RoomBooking
+
+
+def expire_ended_bookings(today=None, now=None):
+    """Mark active bookings whose rental_end_date is before today as expired.
+
+    One UPDATE ... RETURNING; returns [(booking_id, room_id)] of the bookings changed.
+    """
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    return db.session.execute(
+        update(RoomBooking)
+        .where(RoomBooking.status == 'active', RoomBooking.rental_end_date < today)
+        .values(status='expired', updated_at=now)
+        .returning(RoomBooking.booking_id, RoomBooking.room_id),
+        execution_options={'synchronize_session': False}
+    ).all()
+
+
+def reconcile_room_availability(today=None, now=None):
+    """Recompute Room.is_available for every room in one UPDATE.
+
+    A room is available when it is not in a CLOSED_ROOM_STATUSES status and
+    no active booking covers today (the same rule as Room.get_current_booking).
+    Only rooms whose flag is wrong are written; returns [(room_id, is_available)]
+    for them.
+    """
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    free = and_(
+        Room.in_service(),
+        not_(exists().where(
+            RoomBooking.room_id == Room.room_id,
+            RoomBooking.status == 'active',
+            RoomBooking.rental_start_date <= today,
+            RoomBooking.rental_end_date >= today
+        ))
+    )
+    return db.session.execute(
+        update(Room)
+        .where(Room.is_available.is_(None) | (Room.is_available != free))
+        .values(is_available=free, updated_at=now)
+        .returning(Room.room_id, Room.is_available),
+        execution_options={'synchronize_session': False}
+    ).all()
+
+
+def run_booking_maintenance(today=None):
+    """Nightly job: expire ended bookings, then fix room availability, in one transaction.
+
+    Returns the changed ids so the caller can log them.
+    """
+    try:
+        expired = expire_ended_bookings(today)
+        rooms = reconcile_room_availability(today)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {
+        'expired_bookings': sorted(booking_id for booking_id, _ in expired),
+        'rooms_freed': sorted(room_id for room_id, available in rooms if available),
+        'rooms_unavailable': sorted(room_id for room_id, available in rooms if not available)
+    }
@@ -0,0 +1,334 @@
+import json
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import select, update, insert, func
+
+from src.models.user import db
+from src.models.customer import Customer, Contract, Alert
+from src.models.room import Room, RoomBooking, RoomAlert
+from src.models.outbox import AlertOutbox
+from src.jobs.transports import build_message
+
+CLAIM_BATCH_SIZE = 2000  # alerts claimed per transaction
+DELIVERY_BATCH_SIZE = 500  # outbox rows sent per transport connection
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 60  # 1, 2, 4, 8, 16 minutes between retries
+SEND_LEASE_SECONDS = 600  # a claimed outbox row is retried if not settled by then
+LOOKBACK_DAYS = 7  # alerts dated earlier than this are skipped, not sent
+
+ALERT_LABELS = {
+    '2_weeks_before': 'due in 2 weeks',
+    '1_week_before': 'due in 1 week',
+    '3_days_before': 'due in 3 days',
+    'due_date': 'due today',
+    '3_days_overdue': '3 days overdue',
+    '7_days_overdue': '7 days overdue',
+    '20_days_before_30_day_contract': 'ends in 20 days'
+}
+
+
+class ClaimConflict(Exception):
+    """Another worker claimed some of the same alerts first"""
+
+
+def _has_email():
+    return func.coalesce(func.trim(Customer.email), '') != ''
+
+
+def _alert_window(model, date_from, date_to, email_required):
+    conditions = [model.is_sent == False, model.alert_date <= date_to]
+    if date_from is not None:
+        conditions.append(model.alert_date >= date_from)
+    if email_required:
+        conditions.append(_has_email())
+    return conditions
+
+
+def _due_payment_alerts(date_from, date_to, limit, email_required=True):
+    return db.session.execute(
+        select(
+            Alert.alert_id, Alert.alert_type, Alert.alert_date,
+            Contract.contract_id, Contract.contract_type, Contract.contract_end_date,
+            Contract.contract_value, Contract.amount_paid,
+            Customer.customer_id, Customer.customer_name, Customer.email
+        )
+        .join(Contract, Contract.contract_id == Alert.contract_id)
+        .join(Customer, Customer.customer_id == Contract.customer_id)
+        .where(*_alert_window(Alert, date_from, date_to, email_required))
+        .order_by(Alert.alert_date, Alert.alert_id)
+        .limit(limit)
+    ).all()
+
+
+def _due_room_alerts(date_from, date_to, limit, email_required=True):
+    return db.session.execute(
+        select(
+            RoomAlert.alert_id, RoomAlert.alert_type, RoomAlert.alert_date,
+            RoomBooking.booking_id, RoomBooking.rental_end_date, Room.room_number,
+            Customer.customer_id, Customer.customer_name, Customer.email
+        )
+        .join(RoomBooking, RoomBooking.booking_id == RoomAlert.booking_id)
+        .join(Room, Room.room_id == RoomBooking.room_id)
+        .join(Customer, Customer.customer_id == RoomBooking.customer_id)
+        .where(*_alert_window(RoomAlert, date_from, date_to, email_required))
+        .order_by(RoomAlert.alert_date, RoomAlert.alert_id)
+        .limit(limit)
+    ).all()
+
+
+def render_digest(customer_name, payment_rows, room_rows):
+    """Plain-text digest of every alert claimed for one customer"""
+    lines = [f'Kính gửi / Dear {customer_name},', '']
+    if payment_rows:
+        lines.append('Thanh toán hợp đồng / Contract payments:')
+        for row in payment_rows:
+            amount_due = (row.contract_value or 0) - (row.amount_paid or 0)
+            lines.append(
+                f'  - Contract #{row.contract_id} ({row.contract_type}) ends {row.contract_end_date.isoformat()}, '
+                f'{ALERT_LABELS.get(row.alert_type, row.alert_type)}: amount due {amount_due:,.2f} VND'
+            )
+        lines.append('')
+    if room_rows:
+        lines.append('Thuê phòng / Room rentals:')
+        for row in room_rows:
+            lines.append(
+                f'  - Room {row.room_number} (booking #{row.booking_id}) ends {row.rental_end_date.isoformat()}, '
+                f'{ALERT_LABELS.get(row.alert_type, row.alert_type)}'
+            )
+        lines.append('')
+    lines.append('CampusK')
+    count = len(payment_rows) + len(room_rows)
+    subject = f'CampusK: {count} payment reminder{"s" if count != 1 else ""}'
+    return subject, '\n'.join(lines)
+
+
+def _mark_sent(model, ids):
+    """One UPDATE for the whole batch; fails if another worker got there first"""
+    if not ids:
+        return
+    result = db.session.execute(
+        update(model).where(model.alert_id.in_(ids), model.is_sent == False).values(is_sent=True)
+    )
+    if result.rowcount != len(ids):
+        raise ClaimConflict()
+
+
+def _outbox_rows(payment_rows, room_rows, status, last_error, now):
+    """One outbox row per customer for the given alert rows"""
+    by_customer = defaultdict(lambda: {'name': None, 'email': None, 'payment': [], 'room': []})
+    for kind, rows in (('payment', payment_rows), ('room', room_rows)):
+        for row in rows:
+            group = by_customer[row.customer_id]
+            group['name'] = row.customer_name
+            group['email'] = row.email
+            group[kind].append(row)
+
+    outbox_rows = []
+    for customer_id, group in by_customer.items():
+        subject, body = render_digest(group['name'], group['payment'], group['room'])
+        outbox_rows.append({
+            'customer_id': customer_id,
+            'recipient': group['email'],
+            'subject': subject,
+            'body': body,
+            'alert_ids': json.dumps([r.alert_id for r in group['payment']]),
+            'room_alert_ids': json.dumps([r.alert_id for r in group['room']]),
+            'status': status,
+            'attempts': 0,
+            'next_attempt_at': now,
+            'last_error': last_error,
+            'created_at': now
+        })
+    return outbox_rows
+
+
+def _move_to_outbox(payment_rows, room_rows, status, last_error, now):
+    """Mark the alerts as sent and record them in the outbox, in one transaction"""
+    outbox_rows = _outbox_rows(payment_rows, room_rows, status, last_error, now)
+    try:
+        _mark_sent(Alert, [r.alert_id for r in payment_rows])
+        _mark_sent(RoomAlert, [r.alert_id for r in room_rows])
+        db.session.execute(insert(AlertOutbox), outbox_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(outbox_rows)
+
+
+def claim_due_alerts(today=None, batch_size=CLAIM_BATCH_SIZE, now=None, lookback_days=LOOKBACK_DAYS):
+    """Move up to batch_size due alerts into per-customer outbox digests in one transaction.
+
+    Only alerts dated within the last lookback_days are claimed, and only for
+    customers with an email address; the others stay unsent (see
+    skip_stale_alerts and count_unreachable_alerts). Returns the number of
+    outbox rows created (0 when nothing is due).
+    """
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    date_from = today - timedelta(days=lookback_days)
+    payment_rows = _due_payment_alerts(date_from, today, batch_size)
+    room_rows = _due_room_alerts(date_from, today, batch_size)
+    if not payment_rows and not room_rows:
+        return 0
+    return _move_to_outbox(payment_rows, room_rows, 'pending', None, now)
+
+
+def skip_stale_alerts(today=None, batch_size=CLAIM_BATCH_SIZE, now=None, lookback_days=LOOKBACK_DAYS):
+    """Retire up to batch_size unsent alerts dated before the lookback window without sending them.
+
+    Their labels ("due in 2 weeks") are no longer true, so they are marked as
+    sent and recorded in the outbox with status 'skipped'. Returns the number
+    of alerts skipped.
+    """
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    date_to = today - timedelta(days=lookback_days + 1)
+    payment_rows = _due_payment_alerts(None, date_to, batch_size, email_required=False)
+    room_rows = _due_room_alerts(None, date_to, batch_size, email_required=False)
+    if not payment_rows and not room_rows:
+        return 0
+    _move_to_outbox(payment_rows, room_rows, 'skipped', f'Older than the {lookback_days}-day lookback window', now)
+    return len(payment_rows) + len(room_rows)
+
+
+def count_unreachable_alerts(today=None, lookback_days=LOOKBACK_DAYS):
+    """Due alerts left unclaimed because the customer has no email address"""
+    today = today or date.today()
+    date_from = today - timedelta(days=lookback_days)
+    no_email = ~_has_email()
+    payment = db.session.execute(
+        select(func.count()).select_from(Alert)
+        .join(Contract, Contract.contract_id == Alert.contract_id)
+        .join(Customer, Customer.customer_id == Contract.customer_id)
+        .where(*_alert_window(Alert, date_from, today, False), no_email)
+    ).scalar()
+    room = db.session.execute(
+        select(func.count()).select_from(RoomAlert)
+        .join(RoomBooking, RoomBooking.booking_id == RoomAlert.booking_id)
+        .join(Customer, Customer.customer_id == RoomBooking.customer_id)
+        .where(*_alert_window(RoomAlert, date_from, today, False), no_email)
+    ).scalar()
+    return payment + room
+
+
+def _claim_outbox(batch_size, now, lease_until):
+    """Lease up to batch_size due outbox rows to this worker until lease_until; returns the rows it won.
+
+    A row is due when it is 'pending', or 'sending' under a lease that ran out
+    (the worker that held it died mid-send). The claiming UPDATE repeats that
+    condition, so of two workers that selected the same rows only one gets
+    each of them back. Claiming counts as an attempt.
+    """
+    due = (
+        AlertOutbox.status.in_(('pending', 'sending')),
+        AlertOutbox.next_attempt_at <= now
+    )
+    ids = db.session.scalars(
+        select(AlertOutbox.outbox_id)
+        .where(*due)
+        .order_by(AlertOutbox.next_attempt_at, AlertOutbox.outbox_id)
+        .limit(batch_size)
+    ).all()
+    if not ids:
+        return []
+    try:
+        claimed = db.session.execute(
+            update(AlertOutbox)
+            .where(AlertOutbox.outbox_id.in_(ids), *due)
+            .values(
+                status='sending',
+                attempts=AlertOutbox.attempts + 1,
+                next_attempt_at=lease_until
+            )
+            .returning(AlertOutbox.outbox_id, AlertOutbox.recipient, AlertOutbox.subject,
+                       AlertOutbox.body, AlertOutbox.attempts),
+            execution_options={'synchronize_session': False}
+        ).all()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return claimed
+
+
+def deliver_pending(transport, sender, batch_size=DELIVERY_BATCH_SIZE, now=None):
+    """Claim due outbox rows, then send them over one transport connection.
+
+    Returns (claimed, sent, failed); claimed is 0 when nothing was due.
+    """
+    now = now or datetime.utcnow()
+    lease_until = now + timedelta(seconds=SEND_LEASE_SECONDS)
+    claimed = _claim_outbox(batch_size, now, lease_until)
+    if not claimed:
+        return 0, 0, 0
+
+    sent_ids = []
+    failures = []
+    try:
+        with transport:
+            for row in claimed:
+                try:
+                    transport.send(build_message(sender, row.recipient, row.subject, row.body))
+                    sent_ids.append(row.outbox_id)
+                except Exception as e:
+                    failures.append((row, str(e)))
+    except Exception as e:
+        # Could not open the transport at all: every row in the batch is retried later
+        failures = [(row, str(e)) for row in claimed if row.outbox_id not in sent_ids]
+
+    # Still under this worker's lease (not re-claimed after it ran out)
+    mine = (AlertOutbox.status == 'sending', AlertOutbox.next_attempt_at == lease_until)
+    if sent_ids:
+        db.session.execute(
+            update(AlertOutbox).where(AlertOutbox.outbox_id.in_(sent_ids), *mine)
+            .values(status='sent', sent_at=now, last_error=None)
+        )
+    for row, error in failures:
+        db.session.execute(
+            update(AlertOutbox).where(AlertOutbox.outbox_id == row.outbox_id, *mine).values(
+                status='failed' if row.attempts >= MAX_ATTEMPTS else 'pending',
+                last_error=error[:1000],
+                next_attempt_at=now + timedelta(seconds=BACKOFF_BASE_SECONDS * 2 ** (row.attempts - 1))
+            )
+        )
+    db.session.commit()
+    return len(claimed), len(sent_ids), len(failures)
+
+
+def run_delivery_cycle(transport, sender, claim_batch_size=CLAIM_BATCH_SIZE,
+                       delivery_batch_size=DELIVERY_BATCH_SIZE, lookback_days=LOOKBACK_DAYS):
+    """Skip stale alerts, claim everything that is due, then drain the outbox"""
+    skipped = 0
+    while True:
+        try:
+            batch_skipped = skip_stale_alerts(batch_size=claim_batch_size, lookback_days=lookback_days)
+        except ClaimConflict:
+            continue
+        if not batch_skipped:
+            break
+        skipped += batch_skipped
+    claimed = 0
+    while True:
+        try:
+            created = claim_due_alerts(batch_size=claim_batch_size, lookback_days=lookback_days)
+        except ClaimConflict:
+            continue
+        if not created:
+            break
+        claimed += created
+    sent = failed = 0
+    while True:
+        batch_claimed, batch_sent, batch_failed = deliver_pending(transport, sender, batch_size=delivery_batch_size)
+        sent += batch_sent
+        failed += batch_failed
+        if batch_claimed < delivery_batch_size:
+            break
+    return {
+        'digests_created': claimed,
+        'sent': sent,
+        'failed': failed,
+        'skipped_stale': skipped,
+        'no_email': count_unreachable_alerts(lookback_days=lookback_days)
+    }
@@ -0,0 +1,210 @@
+from datetime import date, datetime
+
+from sqlalchemy import select, insert, delete, func, union, union_all, and_, or_, literal, true
+
+from src.models.user import db
+from src.models.customer import Contract, PaymentRequest, Payment
+from src.models.room import Room, RoomBooking
+from src.models.revenue import RevenueMonthly
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _month_ranges(months):
+    """Collapse a set of months into [start, end) ranges of consecutive months"""
+    ranges = []
+    for month in sorted({month_start(m) for m in months if m}):
+        if ranges and ranges[-1][1] == month:
+            ranges[-1][1] = next_month(month)
+        else:
+            ranges.append([month, next_month(month)])
+    return ranges
+
+
+def _in_ranges(column, ranges, as_datetime=False):
+    if ranges is None:
+        return true()
+    bound = (lambda d: datetime.combine(d, datetime.min.time())) if as_datetime else (lambda d: d)
+    return or_(*(and_(column >= bound(start), column < bound(end)) for start, end in ranges))
+
+
+def _month_of(column):
+    return func.date(column, 'start of month', type_=db.Date)
+
+
+# Contracts carry no branch of their own, so revenue is attributed to the
+# branch of the customer's most recent room booking (latest start, then id).
+LATEST_BOOKING_ORDER = (RoomBooking.rental_start_date.desc(), RoomBooking.booking_id.desc())
+
+
+def latest_branch(customer_id):
+    """Correlated scalar subquery: branch of the latest booking of customer_id (a column or value).
+
+    One seek on idx_room_bookings_customer_latest per customer.
+    """
+    return (
+        select(Room.branch_id)
+        .join(RoomBooking, RoomBooking.room_id == Room.room_id)
+        .where(RoomBooking.customer_id == customer_id)
+        .order_by(*LATEST_BOOKING_ORDER)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def customer_branches(customer_ids=None):
+    """customer_id -> branch of the customer's most recent room booking, as a subquery.
+
+    Ranks every booking; pass customer_ids to rank only those customers' bookings.
+    """
+    ranked = (
+        select(
+            RoomBooking.customer_id,
+            Room.branch_id,
+            func.row_number().over(
+                partition_by=RoomBooking.customer_id,
+                order_by=LATEST_BOOKING_ORDER
+            ).label('position')
+        )
+        .join(Room, Room.room_id == RoomBooking.room_id)
+    )
+    if customer_ids is not None:
+        ranked = ranked.where(RoomBooking.customer_id.in_(customer_ids))
+    ranked = ranked.subquery()
+    return select(ranked.c.customer_id, ranked.c.branch_id).where(ranked.c.position == 1).subquery('customer_branches')
+
+
+def _rollup_select(ranges):
+    """Grouped (month, branch, contract type) sums over contracts, payment requests and payments"""
+    zero = literal(0)
+    contracted = select(
+        _month_of(Contract.contract_start_date).label('month'),
+        Contract.customer_id.label('customer_id'),
+        Contract.contract_type.label('contract_type'),
+        Contract.contract_value.label('contracted'),
+        zero.label('invoiced'),
+        zero.label('collected')
+    ).where(_in_ranges(Contract.contract_start_date, ranges))
+    invoiced = select(
+        _month_of(PaymentRequest.issue_date),
+        PaymentRequest.customer_id,
+        Contract.contract_type,
+        zero,
+        PaymentRequest.total_rental_amount,
+        zero
+    ).join(Contract, Contract.contract_id == PaymentRequest.contract_id).where(
+        func.coalesce(PaymentRequest.status, 'pending') != 'cancelled',
+        _in_ranges(PaymentRequest.issue_date, ranges, as_datetime=True)
+    )
+    collected = select(
+        _month_of(Payment.paid_at),
+        Contract.customer_id,
+        Contract.contract_type,
+        zero,
+        zero,
+        Payment.amount
+    ).join(Contract, Contract.contract_id == Payment.contract_id).where(_in_ranges(Payment.paid_at, ranges))
+
+    source = union_all(contracted, invoiced, collected).subquery('source')
+    # Branch looked up per source row, so a refresh only touches the customers in its months
+    attributed = select(source, latest_branch(source.c.customer_id).label('branch_id')).subquery('attributed')
+    return (
+        select(
+            attributed.c.month,
+            attributed.c.branch_id,
+            attributed.c.contract_type,
+            func.round(func.coalesce(func.sum(attributed.c.contracted), 0), 2),
+            func.round(func.coalesce(func.sum(attributed.c.invoiced), 0), 2),
+            func.round(func.coalesce(func.sum(attributed.c.collected), 0), 2),
+            literal(datetime.utcnow(), db.DateTime)
+        )
+        .group_by(attributed.c.month, attributed.c.branch_id, attributed.c.contract_type)
+    )
+
+
+def _insert_rollup(ranges):
+    result = db.session.execute(
+        insert(RevenueMonthly).from_select(
+            ['month', 'branch_id', 'contract_type', 'contracted', 'invoiced', 'collected', 'refreshed_at'],
+            _rollup_select(ranges)
+        )
+    )
+    return result.rowcount
+
+
+def refresh_revenue_months(months):
+    """Recompute the rollup rows for the given months only.
+
+    Called by every write path that touches contracts, payment requests or
+    payments; runs in the caller's transaction (no commit). Returns the
+    number of rollup rows written.
+    """
+    ranges = _month_ranges(months)
+    if not ranges:
+        return 0
+    db.session.flush()
+    db.session.execute(delete(RevenueMonthly).where(_in_ranges(RevenueMonthly.month, ranges)))
+    return _insert_rollup(ranges)
+
+
+def contract_revenue_months(contract_id):
+    """Every month a contract contributes to: its start, its payment requests and its payments"""
+    return set(db.session.scalars(union(
+        select(_month_of(Contract.contract_start_date)).where(Contract.contract_id == contract_id),
+        select(_month_of(PaymentRequest.issue_date)).where(PaymentRequest.contract_id == contract_id),
+        select(_month_of(Payment.paid_at)).where(Payment.contract_id == contract_id)
+    )))
+
+
+def customer_revenue_months(customer_ids):
+    """Every month the customers' contracts, payment requests and payments contribute to"""
+    if not customer_ids:
+        return set()
+    customer_ids = list(customer_ids)
+    return set(db.session.scalars(union(
+        select(_month_of(Contract.contract_start_date)).where(Contract.customer_id.in_(customer_ids)),
+        select(_month_of(PaymentRequest.issue_date)).where(PaymentRequest.customer_id.in_(customer_ids)),
+        select(_month_of(Payment.paid_at)).join(Contract, Contract.contract_id == Payment.contract_id)
+        .where(Contract.customer_id.in_(customer_ids))
+    )))
+
+
+def branch_snapshot(customer_ids):
+    """{customer_id: attributed branch_id} for the customers, before a booking write"""
+    customer_ids = list({customer_id for customer_id in customer_ids if customer_id is not None})
+    if not customer_ids:
+        return {}
+    branches = dict(db.session.execute(select(*customer_branches(customer_ids).c)).all())
+    return {customer_id: branches.get(customer_id) for customer_id in customer_ids}
+
+
+def refresh_moved_customers(snapshot):
+    """After booking writes: re-attribute every month of the customers whose branch changed.
+
+    `snapshot` comes from branch_snapshot() taken before the writes. Runs in
+    the caller's transaction (no commit); returns the rollup rows written.
+    """
+    if not snapshot:
+        return 0
+    db.session.flush()
+    after = branch_snapshot(snapshot)
+    moved = [customer_id for customer_id, branch_id in snapshot.items() if after.get(customer_id) != branch_id]
+    return refresh_revenue_months(customer_revenue_months(moved))
+
+
+def rebuild_revenue_rollup():
+    """Recompute the whole rollup from scratch (also re-attributes branches); commits"""
+    try:
+        db.session.execute(delete(RevenueMonthly))
+        rows = _insert_rollup(None)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return rows
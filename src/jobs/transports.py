@@ -0,0 +1,90 @@
+import json
+import os
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+
+
+class FileTransport:
+    """Appends each message as one JSON line to a file (useful in development)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+        self._file = None
+
+    def send(self, message):
+        self._file.write(json.dumps({
+            'to': message['To'],
+            'from': message['From'],
+            'subject': message['Subject'],
+            'body': message.get_content(),
+            'written_at': datetime.utcnow().isoformat()
+        }, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+
+class SMTPTransport:
+    """Sends over one SMTP connection per batch (e.g. `python -m aiosmtpd -n` locally)"""
+
+    def __init__(self, host='localhost', port=25, username=None, password=None, use_tls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._smtp = None
+
+    def __enter__(self):
+        self._smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            self._smtp.starttls()
+        if self.username:
+            self._smtp.login(self.username, self.password)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._smtp.quit()
+        except smtplib.SMTPException:
+            pass
+        self._smtp = None
+
+    def send(self, message):
+        self._smtp.send_message(message)
+
+
+def build_message(sender, recipient, subject, body):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = recipient
+    message['Subject'] = subject
+    message.set_content(body)
+    return message
+
+
+def transport_from_config(config):
+    """ALERT_TRANSPORT selects 'file' (default) or 'smtp'"""
+    kind = config.get('ALERT_TRANSPORT', 'file')
+    if kind == 'smtp':
+        return SMTPTransport(
+            host=config.get('ALERT_SMTP_HOST', 'localhost'),
+            port=config.get('ALERT_SMTP_PORT', 25),
+            username=config.get('ALERT_SMTP_USERNAME'),
+            password=config.get('ALERT_SMTP_PASSWORD'),
+            use_tls=config.get('ALERT_SMTP_TLS', False)
+        )
+    if kind == 'file':
+        return FileTransport(config.get('ALERT_FILE_SINK', os.path.join('logs', 'alert_outbox.ndjson')))
+    raise ValueError(f'Unknown ALERT_TRANSPORT: {kind}')
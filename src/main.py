@@ -10,12 +10,20 @@ from src.routes.user import user_bp
 from src.routes.customer import customer_bp
 from src.routes.room import room_bp
 from src.routes.contracts import contract_bp
+from src.routes.imports import import_bp
+from src.routes.exports import export_bp
+from src.routes.payments import payment_bp
+from src.routes.reports import reports_bp
+from src.serializers import AppJSONProvider
+from src.availability import availability_index
+from src.amenities import amenity_index
 from werkzeug.exceptions import RequestEntityTooLarge
 import time
 from collections import defaultdict, deque
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+app.json = AppJSONProvider(app)  # Decimal/date aware, orjson when installed
 
 # Performance configurations
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
@@ -24,6 +32,17 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_recycle': -1,
     'pool_pre_ping': True
 }
+app.config['DASHBOARD_CACHE_TTL'] = 10  # seconds
+app.config['AVAILABILITY_INDEX_MAX_AGE'] = 300  # seconds; bounds staleness when other processes write bookings
+app.config['AMENITY_INDEX_MAX_AGE'] = 300  # seconds; same bound for the room amenity bitmaps
+
+# Alert delivery worker (run_alert_worker.py): 'file' writes to ALERT_FILE_SINK, 'smtp' uses ALERT_SMTP_*
+app.config['ALERT_TRANSPORT'] = os.environ.get('ALERT_TRANSPORT', 'file')
+app.config['ALERT_FILE_SINK'] = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs', 'alert_outbox.ndjson')
+app.config['ALERT_SMTP_HOST'] = os.environ.get('ALERT_SMTP_HOST', 'localhost')
+app.config['ALERT_SMTP_PORT'] = int(os.environ.get('ALERT_SMTP_PORT', 25))
+app.config['ALERT_SENDER'] = os.environ.get('ALERT_SENDER', 'no-reply@campusk.vn')
+app.config['ALERT_LOOKBACK_DAYS'] = int(os.environ.get('ALERT_LOOKBACK_DAYS', 7))  # older unsent alerts are skipped
 
 # Simple rate limiting
 rate_limit_storage = defaultdict(lambda: deque())
@@ -64,18 +83,27 @@ app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(customer_bp, url_prefix='/api')
 app.register_blueprint(room_bp, url_prefix='/api')
 app.register_blueprint(contract_bp, url_prefix='/api')
+app.register_blueprint(import_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(payment_bp, url_prefix='/api')
+app.register_blueprint(reports_bp, url_prefix='/api')
 
 # uncomment if you need to use database
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Import all models to ensure they are registered
-from src.models.customer import Customer, Contract, WebBooking, Alert
-from src.models.room import Branch, Room, RoomBooking, RoomAlert, WebRoomBooking
+from src.models.customer import Customer, Contract, WebBooking, Alert, Payment
+from src.models.room import Branch, Room, RoomBooking, RoomAlert, WebRoomBooking, Amenity
+from src.models.outbox import AlertOutbox
+from src.models.revenue import RevenueMonthly
 
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    availability_index.rebuild()
+    # Also normalizes rooms written before room_amenities existed
+    amenity_index.rebuild()
 
 # Error handlers
 @app.errorhandler(RequestEntityTooLarge)
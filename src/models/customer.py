@@ -1,9 +1,11 @@
 from src.models.user import db
 from datetime import datetime, date
 from decimal import Decimal
+from src.models.fieldsets import FieldsetMixin
 
-class Customer(db.Model):
+class Customer(db.Model, FieldsetMixin):
     __tablename__ = 'customers'
+    __expandable__ = ('contracts', 'room_bookings', 'payment_requests')
     
     customer_id = db.Column(db.Integer, primary_key=True)
     customer_name = db.Column(db.String(255), nullable=False)
@@ -50,8 +52,13 @@ class Customer(db.Model):
         }
 
 
-class Contract(db.Model):
+class Contract(db.Model, FieldsetMixin):
     __tablename__ = 'contracts'
+    __table_args__ = (
+        db.Index('idx_contracts_customer_id', 'customer_id'),
+    )
+    __expandable__ = ('customer', 'alerts', 'payment_requests', 'payments')
+    __computed_fields__ = {'amount_due': (('contract_value', 'amount_paid'), 'calculate_amount_due')}
     
     contract_id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id'), nullable=False)
@@ -94,7 +101,7 @@ class Contract(db.Model):
         }
 
 
-class WebBooking(db.Model):
+class WebBooking(db.Model, FieldsetMixin):
     __tablename__ = 'web_bookings'
     
     web_booking_id = db.Column(db.Integer, primary_key=True)
@@ -114,8 +121,13 @@ class WebBooking(db.Model):
         }
 
 
-class Alert(db.Model):
+class Alert(db.Model, FieldsetMixin):
     __tablename__ = 'alerts'
+    __table_args__ = (
+        db.Index('idx_alerts_sent_date', 'is_sent', 'alert_date'),
+        db.Index('idx_alerts_contract_id', 'contract_id'),
+    )
+    __expandable__ = ('contract',)
     
     alert_id = db.Column(db.Integer, primary_key=True)
     contract_id = db.Column(db.Integer, db.ForeignKey('contracts.contract_id'), nullable=False)
@@ -139,8 +151,47 @@ class Alert(db.Model):
         }
 
 
-class PaymentRequest(db.Model):
+class Payment(db.Model, FieldsetMixin):
+    __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('idx_payments_contract_paid', 'contract_id', 'paid_at'),
+        db.Index('idx_payments_paid_at', 'paid_at'),
+    )
+    __expandable__ = ('contract',)
+    
+    payment_id = db.Column(db.Integer, primary_key=True)
+    contract_id = db.Column(db.Integer, db.ForeignKey('contracts.contract_id'), nullable=False)
+    amount = db.Column(db.Numeric(18, 2), nullable=False)  # negative for refunds/corrections
+    paid_at = db.Column(db.Date, nullable=False)
+    method = db.Column(db.String(50))  # cash, transfer, adjustment, opening_balance...
+    reference = db.Column(db.String(255))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    contract = db.relationship('Contract', backref=db.backref('payments', lazy=True, cascade='all, delete-orphan'))
+    
+    def __repr__(self):
+        return f'<Payment {self.payment_id} - Contract {self.contract_id}>'
+    
+    def to_dict(self):
+        return {
+            'payment_id': self.payment_id,
+            'contract_id': self.contract_id,
+            'amount': float(self.amount),
+            'paid_at': self.paid_at.isoformat() if self.paid_at else None,
+            'method': self.method,
+            'reference': self.reference,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class PaymentRequest(db.Model, FieldsetMixin):
     __tablename__ = 'payment_requests'
+    __table_args__ = (
+        db.Index('idx_payment_requests_issue_date', 'issue_date'),
+    )
+    __expandable__ = ('customer', 'contract')
     
     payment_request_id = db.Column(db.Integer, primary_key=True)
     payment_request_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -0,0 +1,116 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, joinedload, selectinload
+
+from src.serializers import json_value
+
+
+class InvalidFieldset(ValueError):
+    """Raised when ?fields= or ?expand= names something the model does not expose"""
+
+
+def _split(value):
+    return [part.strip() for part in value.split(',') if part.strip()] if value else []
+
+
+class FieldsetMixin:
+    """Sparse serialization shared by the models.
+
+    Models list the relationships a client may ask for in `__expandable__` and
+    derived values in `__computed_fields__` as {name: (dependency columns, method name)}.
+    Expansions that are not relationships (e.g. Room.current_booking) go in
+    `__computed_expansions__` as {name: method name}.
+    """
+    __expandable__ = ()
+    __computed_fields__ = {}
+    __computed_expansions__ = {}
+
+    @classmethod
+    def column_names(cls):
+        return [attr.key for attr in inspect(cls).column_attrs]
+
+    @classmethod
+    def primary_key_names(cls):
+        mapper = inspect(cls)
+        return [mapper.get_property_by_column(col).key for col in mapper.primary_key]
+
+    def to_sparse_dict(self, fields=None, expand=()):
+        """Serialize only `fields` (all columns when None) plus the `expand`ed relations"""
+        names = self.column_names() + list(self.__computed_fields__) if fields is None else fields
+        result = {}
+        for name in names:
+            if name in self.__computed_fields__:
+                result[name] = getattr(self, self.__computed_fields__[name][1])()
+            else:
+                result[name] = json_value(getattr(self, name))
+        for name in expand:
+            if name in self.__computed_expansions__:
+                result[name] = getattr(self, self.__computed_expansions__[name])()
+                continue
+            related = getattr(self, name)
+            if related is None:
+                result[name] = None
+            elif isinstance(related, list):
+                result[name] = [item.to_sparse_dict() for item in related]
+            else:
+                result[name] = related.to_sparse_dict()
+        return result
+
+
+class Fieldset:
+    """Columns and relationships requested through ?fields=a,b&expand=rel"""
+
+    def __init__(self, model, fields=None, expand=(), extra_fields=()):
+        self.model = model
+        allowed = set(model.column_names()) | set(model.__computed_fields__)
+        expandable = set(model.__expandable__) | set(model.__computed_expansions__)
+        self.extras = []
+        if fields is not None:
+            unknown = [f for f in fields if f not in allowed and f not in extra_fields]
+            if unknown:
+                raise InvalidFieldset(f"Unknown fields: {', '.join(unknown)}")
+            self.extras = [f for f in fields if f in extra_fields and f not in allowed]
+            fields = [f for f in fields if f in allowed]
+            # Always identify the row
+            for pk in model.primary_key_names():
+                if pk not in fields:
+                    fields.insert(0, pk)
+        unknown = [e for e in expand if e not in expandable]
+        if unknown:
+            raise InvalidFieldset(f"Unknown expansions: {', '.join(unknown)}")
+        self.fields = fields
+        self.expand = list(expand)
+
+    @classmethod
+    def from_args(cls, args, model, extra_fields=()):
+        """Build a Fieldset from request args; None when neither fields nor expand was given"""
+        if 'fields' not in args and 'expand' not in args:
+            return None
+        fields = _split(args.get('fields')) or None
+        return cls(model, fields, _split(args.get('expand')), extra_fields)
+
+    def wants(self, name):
+        return self.fields is None or name in self.extras
+
+    def apply(self, query):
+        """Restrict the SELECT to the requested columns and eager-load only the requested relations"""
+        mapper = inspect(self.model)
+        options = []
+        if self.fields is not None:
+            columns = set(self.fields)
+            for name in self.fields:
+                if name in self.model.__computed_fields__:
+                    columns.discard(name)
+                    columns.update(self.model.__computed_fields__[name][0])
+            options.append(load_only(*[getattr(self.model, name) for name in columns]))
+        for name in self.expand:
+            if name not in mapper.relationships:
+                continue
+            relationship = getattr(self.model, name)
+            if mapper.relationships[name].uselist:
+                options.append(selectinload(relationship))
+            else:
+                options.append(joinedload(relationship))
+        return query.options(*options) if options else query
+
+    def serialize(self, obj):
+        return obj.to_sparse_dict(self.fields, self.expand)
@@ -0,0 +1,44 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class AlertOutbox(db.Model):
+    """One rendered alert digest per customer, with delivery retry state"""
+    __tablename__ = 'alert_outbox'
+    __table_args__ = (
+        db.Index('idx_alert_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+    outbox_id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id'), nullable=False)
+    recipient = db.Column(db.String(255))
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    alert_ids = db.Column(db.Text)  # JSON list of alerts.alert_id
+    room_alert_ids = db.Column(db.Text)  # JSON list of room_alerts.alert_id
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed, skipped
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)  # lease expiry while 'sending'
+    last_error = db.Column(db.Text)
+    sent_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<AlertOutbox {self.outbox_id} - {self.status}>'
+
+    def to_dict(self):
+        return {
+            'outbox_id': self.outbox_id,
+            'customer_id': self.customer_id,
+            'recipient': self.recipient,
+            'subject': self.subject,
+            'body': self.body,
+            'alert_ids': json.loads(self.alert_ids) if self.alert_ids else [],
+            'room_alert_ids': json.loads(self.room_alert_ids) if self.room_alert_ids else [],
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
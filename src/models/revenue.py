@@ -0,0 +1,32 @@
+from src.models.user import db
+from datetime import datetime
+
+class RevenueMonthly(db.Model):
+    """Pre-summed revenue per month, branch and contract type (maintained by src.jobs.revenue)"""
+    __tablename__ = 'revenue_monthly'
+    __table_args__ = (
+        db.Index('idx_revenue_monthly_month', 'month', 'branch_id', 'contract_type'),
+    )
+
+    revenue_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False)  # first day of the month
+    branch_id = db.Column(db.Integer)  # NULL when the customer never booked a room
+    contract_type = db.Column(db.String(255), nullable=False)
+    contracted = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # contract_value by contract start month
+    invoiced = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # payment request totals by issue month
+    collected = db.Column(db.Numeric(18, 2), nullable=False, default=0)  # payments ledger by paid_at month
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RevenueMonthly {self.month} - {self.branch_id} - {self.contract_type}>'
+
+    def to_dict(self):
+        return {
+            'month': self.month.isoformat() if self.month else None,
+            'branch_id': self.branch_id,
+            'contract_type': self.contract_type,
+            'contracted': float(self.contracted),
+            'invoiced': float(self.invoiced),
+            'collected': float(self.collected),
+            'refreshed_at': self.refreshed_at.isoformat() if self.refreshed_at else None
+        }
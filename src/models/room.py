@@ -1,9 +1,12 @@
 from src.models.user import db
+from sqlalchemy import func
 from datetime import datetime, date
 from decimal import Decimal
+from src.models.fieldsets import FieldsetMixin
 
-class Branch(db.Model):
+class Branch(db.Model, FieldsetMixin):
     __tablename__ = 'branches'
+    __expandable__ = ('rooms',)
     
     branch_id = db.Column(db.Integer, primary_key=True)
     branch_name = db.Column(db.String(255), nullable=False)
@@ -34,8 +37,42 @@ class Branch(db.Model):
         return result
 
 
-class Room(db.Model):
+room_amenities = db.Table(
+    'room_amenities',
+    db.Column('room_id', db.Integer, db.ForeignKey('rooms.room_id', ondelete='CASCADE'), primary_key=True),
+    db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.amenity_id', ondelete='CASCADE'), primary_key=True),
+    db.Index('idx_room_amenities_amenity_id', 'amenity_id')
+)
+
+
+class Amenity(db.Model, FieldsetMixin):
+    """Amenity dictionary; Room.amenities (free text) is normalized into it"""
+    __tablename__ = 'amenities'
+    
+    amenity_id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # normalized key, e.g. 'air conditioning'
+    label = db.Column(db.String(255), nullable=False)  # as first written, e.g. 'Air conditioning'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Amenity {self.name}>'
+    
+    def to_dict(self):
+        return {
+            'amenity_id': self.amenity_id,
+            'name': self.name,
+            'label': self.label
+        }
+
+
+# Room.status values that take a room out of service (never available, whatever its bookings)
+CLOSED_ROOM_STATUSES = ('maintenance', 'closed')
+
+
+class Room(db.Model, FieldsetMixin):
     __tablename__ = 'rooms'
+    __expandable__ = ('branch', 'bookings')
+    __computed_expansions__ = {'current_booking': 'get_current_booking'}
     
     room_id = db.Column(db.Integer, primary_key=True)
     branch_id = db.Column(db.Integer, db.ForeignKey('branches.branch_id'), nullable=False)
@@ -54,6 +91,8 @@ class Room(db.Model):
     
     # Relationship with bookings
     bookings = db.relationship('RoomBooking', backref='room', lazy=True, cascade='all, delete-orphan')
+    # Normalized form of `amenities`, kept in sync by src.amenities.sync_room_amenities
+    amenity_set = db.relationship('Amenity', secondary=room_amenities, lazy=True)
     
     def __repr__(self):
         return f'<Room {self.room_number} - Branch {self.branch_id}>'
@@ -83,19 +122,58 @@ class Room(db.Model):
     
     def get_current_booking(self):
         """Get current active booking for this room"""
-        today = date.today()
-        current_booking = RoomBooking.query.filter(
-            RoomBooking.room_id == self.room_id,
+        if '_current_booking' in self.__dict__:
+            current_booking = self._current_booking
+        else:
+            today = date.today()
+            current_booking = RoomBooking.query.filter(
+                RoomBooking.room_id == self.room_id,
+                RoomBooking.rental_start_date <= today,
+                RoomBooking.rental_end_date >= today,
+                RoomBooking.status == 'active'
+            ).first()
+        
+        return current_booking.to_dict(include_room=False, include_customer=True) if current_booking else None
+    
+    @classmethod
+    def in_service(cls):
+        """SQL condition: status is not in CLOSED_ROOM_STATUSES (rooms with no status count as in service)"""
+        return func.coalesce(cls.status, '').notin_(CLOSED_ROOM_STATUSES)
+
+    @classmethod
+    def prefetch_current_bookings(cls, rooms, today=None):
+        """Resolve the current booking (with customer) for a whole page of rooms in one query"""
+        from src.models.customer import Customer
+        rooms = list(rooms)
+        if not rooms:
+            return rooms
+        today = today or date.today()
+        bookings = RoomBooking.query.join(RoomBooking.customer).options(
+            db.contains_eager(RoomBooking.customer).load_only(
+                Customer.customer_id, Customer.customer_name, Customer.email,
+                Customer.mobile, Customer.company_name
+            )
+        ).filter(
+            RoomBooking.room_id.in_({room.room_id for room in rooms}),
             RoomBooking.rental_start_date <= today,
             RoomBooking.rental_end_date >= today,
             RoomBooking.status == 'active'
-        ).first()
-        
-        return current_booking.to_dict(include_room=False, include_customer=True) if current_booking else None
+        ).order_by(RoomBooking.booking_id).all()
+        by_room = {}
+        for booking in bookings:
+            by_room.setdefault(booking.room_id, booking)
+        for room in rooms:
+            room._current_booking = by_room.get(room.room_id)
+        return rooms
 
 
-class RoomBooking(db.Model):
+class RoomBooking(db.Model, FieldsetMixin):
     __tablename__ = 'room_bookings'
+    __table_args__ = (
+        db.Index('idx_room_bookings_conflict', 'room_id', 'status', 'rental_start_date', 'rental_end_date'),
+        db.Index('idx_room_bookings_customer_latest', 'customer_id', 'rental_start_date', 'booking_id'),
+    )
+    __expandable__ = ('room', 'customer', 'alerts')
     
     booking_id = db.Column(db.Integer, primary_key=True)
     room_id = db.Column(db.Integer, db.ForeignKey('rooms.room_id'), nullable=False)
@@ -145,8 +223,13 @@ class RoomBooking(db.Model):
         return result
 
 
-class RoomAlert(db.Model):
+class RoomAlert(db.Model, FieldsetMixin):
     __tablename__ = 'room_alerts'
+    __table_args__ = (
+        db.Index('idx_room_alerts_booking_id', 'booking_id'),
+        db.Index('idx_room_alerts_sent_date', 'is_sent', 'alert_date'),
+    )
+    __expandable__ = ('booking',)
     
     alert_id = db.Column(db.Integer, primary_key=True)
     booking_id = db.Column(db.Integer, db.ForeignKey('room_bookings.booking_id'), nullable=False)
@@ -172,8 +255,9 @@ class RoomAlert(db.Model):
         return result
 
 
-class WebRoomBooking(db.Model):
+class WebRoomBooking(db.Model, FieldsetMixin):
     __tablename__ = 'web_room_bookings'
+    __expandable__ = ('branch', 'room')
     
     web_booking_id = db.Column(db.Integer, primary_key=True)
     customer_name = db.Column(db.String(255), nullable=False)
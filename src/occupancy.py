@@ -0,0 +1,114 @@
+from collections import defaultdict
+from itertools import accumulate
+
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.room import Branch, Room, RoomBooking
+
+# Bookings that occupied (or still occupy) their room; cancelled ones never did
+OCCUPYING_STATUSES = ('active', 'expired')
+MAX_OCCUPANCY_DAYS = 731
+
+
+def _cents(value):
+    return int(round((value or 0) * 100))
+
+
+def occupancy_timeline(date_from, date_to, branch_id=None, include_matrix=True):
+    """Day-by-room occupancy for [date_from, date_to] plus per-branch daily series.
+
+    Every booking interval is applied to per-branch difference arrays (one +/-
+    pair per booking) and the daily series come out of a prefix sum, so the
+    work is proportional to bookings + branches x days rather than rooms x days.
+    The room matrix is one string per room ('1' = occupied), filled by slice
+    assignment per booking.
+    """
+    days = (date_to - date_from).days + 1
+
+    room_query = select(Room.room_id, Room.room_number, Room.branch_id, Room.rental_price).order_by(
+        Room.branch_id, Room.room_number, Room.room_id
+    )
+    booking_query = (
+        select(RoomBooking.room_id, RoomBooking.rental_start_date, RoomBooking.rental_end_date, RoomBooking.monthly_rent)
+        .where(
+            RoomBooking.status.in_(OCCUPYING_STATUSES),
+            RoomBooking.rental_start_date <= date_to,
+            RoomBooking.rental_end_date >= date_from
+        )
+        .order_by(RoomBooking.room_id, RoomBooking.rental_start_date)
+    )
+    if branch_id:
+        room_query = room_query.where(Room.branch_id == branch_id)
+        booking_query = booking_query.join(Room, Room.room_id == RoomBooking.room_id).where(Room.branch_id == branch_id)
+    rooms = db.session.execute(room_query).all()
+
+    # Clip every booking to the window as day offsets
+    intervals = defaultdict(list)
+    for room_id, start, end, rent in db.session.execute(booking_query):
+        intervals[room_id].append((max((start - date_from).days, 0), min((end - date_from).days, days - 1), rent))
+
+    occupied_diff = defaultdict(lambda: [0] * (days + 1))
+    rent_diff = defaultdict(lambda: [0] * (days + 1))
+    room_counts = defaultdict(int)
+    matrix = []
+    for room in rooms:
+        occupied, rent_cents = occupied_diff[room.branch_id], rent_diff[room.branch_id]
+        room_counts[room.branch_id] += 1
+        cells = bytearray(b'0' * days) if include_matrix else None
+        covered_until = -1
+        for first, last, rent in intervals.get(room.room_id, ()):
+            cents = _cents(rent if rent is not None else room.rental_price)
+            rent_cents[first] += cents
+            rent_cents[last + 1] -= cents
+            # Legacy overlapping bookings must not count the room twice on a day
+            if last > covered_until:
+                occupied[max(first, covered_until + 1)] += 1
+                occupied[last + 1] -= 1
+                covered_until = last
+            if cells is not None:
+                cells[first:last + 1] = b'1' * (last - first + 1)
+        if cells is not None:
+            matrix.append({
+                'room_id': room.room_id,
+                'room_number': room.room_number,
+                'branch_id': room.branch_id,
+                'days': cells.decode('ascii')
+            })
+
+    branch_names = dict(db.session.execute(
+        select(Branch.branch_id, Branch.branch_name).where(Branch.branch_id.in_(list(room_counts)))
+    ).all()) if room_counts else {}
+    branches = []
+    total_occupied = [0] * days
+    total_rent = [0] * days
+    for branch, room_total in room_counts.items():
+        occupied = list(accumulate(occupied_diff[branch]))[:days]
+        rent = list(accumulate(rent_diff[branch]))[:days]
+        total_occupied = list(map(int.__add__, total_occupied, occupied))
+        total_rent = list(map(int.__add__, total_rent, rent))
+        branches.append({
+            'branch_id': branch,
+            'branch_name': branch_names.get(branch),
+            'rooms': room_total,
+            'occupied_rooms': occupied,
+            'occupancy_rate': [round(count / room_total, 4) for count in occupied],
+            'revenue_at_rent': [cents / 100 for cents in rent]
+        })
+
+    room_total = len(rooms)
+    result = {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'days': days,
+        'rooms': room_total,
+        'branches': branches,
+        'totals': {
+            'occupied_rooms': total_occupied,
+            'occupancy_rate': [round(count / room_total, 4) if room_total else 0.0 for count in total_occupied],
+            'revenue_at_rent': [cents / 100 for cents in total_rent]
+        }
+    }
+    if include_matrix:
+        result['matrix'] = matrix
+    return result
@@ -0,0 +1,166 @@
+import base64
+import json
+from datetime import datetime, date
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import and_, or_
+
+from src.cache import TTLCache
+
+# Total counts are expensive on large tables, so cursor mode only returns them
+# on request and keeps them for a short while
+COUNT_CACHE_TTL = 30  # seconds
+MAX_PER_PAGE = 100
+
+_count_cache = TTLCache(ttl=COUNT_CACHE_TTL)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def wants_cursor(args):
+    """Cursor mode is opt-in: any request carrying a `cursor` argument (even empty)"""
+    return 'cursor' in args
+
+
+def wants_total(args):
+    """Totals are optional in cursor mode: ?with_total=1"""
+    return args.get('with_total', '').lower() in ('1', 'true', 'yes')
+
+
+def wants_all(args):
+    """Unbounded legacy lists are opt-in: ?all=1"""
+    return args.get('all', '').lower() in ('1', 'true', 'yes')
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['dec', str(value)]
+    return ['v', value]
+
+
+def _decode_value(item):
+    kind, value = item
+    if kind == 'dt':
+        return datetime.fromisoformat(value)
+    if kind == 'd':
+        return date.fromisoformat(value)
+    if kind == 'dec':
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(direction, key):
+    """Build an opaque cursor token from a direction ('next'/'prev') and a seek key"""
+    payload = {'d': direction, 'k': [_encode_value(v) for v in key]}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token; returns (direction, key) or (None, None) for the first page"""
+    if not token:
+        return None, None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction = payload['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, tuple(_decode_value(item) for item in payload['k'])
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+
+def cached_count(query):
+    """COUNT(*) for a query, cached for COUNT_CACHE_TTL seconds per distinct SQL + params"""
+    statement = query.statement.compile()
+    cache_key = (str(statement), repr(sorted(statement.params.items())))
+    return _count_cache.get_or_compute(cache_key, lambda: query.order_by(None).count())
+
+
+def _seek_filter(columns, key, forward):
+    """Row-value comparison (c1, c2) > (v1, v2) expanded so every backend can use the index"""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == key[j] for j in range(i)]
+        compare = column > key[i] if forward else column < key[i]
+        clauses.append(and_(*equal_prefix, compare))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, sort_columns, cursor=None, per_page=10, descending=False,
+                    with_total=False):
+    """Seek-based pagination over `sort_columns` (an indexed sort key followed by the primary key).
+
+    Each page costs one indexed range scan of per_page + 1 rows, no matter how deep it is.
+    Returns a dict with items, next_cursor, prev_cursor, has_next, has_prev and,
+    when with_total is set, a cached total.
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    direction, key = decode_cursor(cursor)
+    if key is not None and len(key) != len(sort_columns):
+        raise InvalidCursor('Invalid cursor')
+
+    base_query = query
+    backwards = direction == 'prev'
+    # Walking backwards means seeking against the natural order, then flipping the page
+    forward = descending == backwards
+    if key is not None:
+        query = query.filter(_seek_filter(sort_columns, key, forward))
+    ordering = [c.asc() if forward else c.desc() for c in sort_columns]
+    rows = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def row_key(row):
+        return tuple(getattr(row, c.key) for c in sort_columns)
+
+    has_next = has_more if not backwards else key is not None
+    has_prev = has_more if backwards else key is not None
+
+    result = {
+        'items': rows,
+        'next_cursor': encode_cursor('next', row_key(rows[-1])) if rows and has_next else None,
+        'prev_cursor': encode_cursor('prev', row_key(rows[0])) if rows and has_prev else None,
+        'has_next': has_next,
+        'has_prev': has_prev,
+        'per_page': per_page,
+    }
+    if with_total:
+        result['total'] = cached_count(base_query)
+    return result
+
+
+def cursor_response(page, items_key, serialized_items):
+    """Standard JSON body for cursor-mode list endpoints"""
+    body = {
+        items_key: serialized_items,
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'has_next': page['has_next'],
+        'has_prev': page['has_prev'],
+        'per_page': page['per_page'],
+    }
+    if 'total' in page:
+        body['total'] = page['total']
+    return body
+
+
+def next_page_link(page):
+    """Link header value for the next cursor page of the current request, or None on the last page"""
+    if not page['next_cursor']:
+        return None
+    args = request.args.to_dict(flat=False)
+    args.update(cursor=[page['next_cursor']], per_page=[str(page['per_page'])])
+    return f'<{request.base_url}?{urlencode(args, doseq=True)}>; rel="next"'
@@ -1,10 +1,26 @@
-from flask import Blueprint, request, jsonify
-from src.models.customer import db, Customer, Contract, WebBooking, Alert
+from flask import Blueprint, request, jsonify, current_app
+from src.models.customer import db, Customer, Contract, WebBooking, Alert, Payment
 from datetime import datetime, date, timedelta
-from sqlalchemy import or_
+from decimal import Decimal
+from sqlalchemy import or_, func, case, select, insert, delete, update
+from sqlalchemy.orm import joinedload, contains_eager
+from src.pagination import InvalidCursor, MAX_PER_PAGE, keyset_paginate, cursor_response, wants_cursor, wants_total, wants_all, next_page_link
+from src.models.fieldsets import Fieldset, InvalidFieldset
+from src.cache import TTLCache
+from src.serializers import model_columns, parse_date, date_arg
+from src.aggregates import sum_cents, cents_to_decimal
+from src.jobs.revenue import refresh_revenue_months, contract_revenue_months, customer_revenue_months
 
 customer_bp = Blueprint('customer', __name__)
 
+ACTIVE_CONTRACT_STATUSES = ('Khách book', 'Khách đã thanh toán')
+
+# Per-row contract aggregates the customer list can return alongside model columns
+CUSTOMER_SUMMARY_FIELDS = ('contract_count', 'active_contracts_count', 'status_summary')
+
+# Shared by concurrent dashboard loads; expiry comes from DASHBOARD_CACHE_TTL
+dashboard_cache = TTLCache()
+
 # Test endpoint
 @customer_bp.route('/test', methods=['GET'])
 def test_endpoint():
@@ -23,8 +39,14 @@ def get_customers():
         per_page = min(request.args.get('per_page', 10, type=int), 100)  # Limit max 100
         search = request.args.get('search', '')
         status = request.args.get('status', '')
+        fieldset = Fieldset.from_args(request.args, Customer, extra_fields=CUSTOMER_SUMMARY_FIELDS)
         
         query = Customer.query
+        if fieldset:
+            query = fieldset.apply(query)
+        else:
+            # Default list: plain column rows, no ORM instances or to_dict()
+            query = query.with_entities(*model_columns(Customer), *_contract_summary_columns())
         
         # Apply search filter with optimized OR conditions
         if search:
@@ -46,38 +68,24 @@ def get_customers():
                 db.session.query(customer_ids_subquery.c.customer_id)
             ))
         
+        # Cursor mode: seek on (customer_name, customer_id) instead of COUNT + OFFSET
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [Customer.customer_name, Customer.customer_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=wants_total(request.args)
+            )
+            customer_list = _customer_list(result['items'], fieldset)
+            return jsonify(cursor_response(result, 'customers', customer_list)), 200
+        
         # Add consistent ordering
-        query = query.order_by(Customer.customer_name)
+        query = query.order_by(Customer.customer_name, Customer.customer_id)
         
         customers = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        # Optimize serialization - don't include all contracts by default
-        # Instead provide lightweight aggregates for UI columns
-        customer_list = []
-        for customer in customers.items:
-            customer_dict = customer.to_dict()
-            # Remove heavy contracts array
-            customer_dict.pop('contracts', None)
-
-            # Aggregate contract info
-            cust_contracts = Contract.query.filter_by(customer_id=customer.customer_id).all()
-            contract_count = len(cust_contracts)
-            active_contracts_count = len([
-                c for c in cust_contracts if c.status in ('Khách book', 'Khách đã thanh toán')
-            ])
-
-            customer_dict['contract_count'] = contract_count
-            customer_dict['active_contracts_count'] = active_contracts_count
-            if contract_count == 0:
-                customer_dict['status_summary'] = 'No Contracts'
-            elif active_contracts_count > 0:
-                customer_dict['status_summary'] = 'Active'
-            else:
-                customer_dict['status_summary'] = 'Inactive'
-
-            customer_list.append(customer_dict)
+        customer_list = _customer_list(customers.items, fieldset)
         
         return jsonify({
             'customers': customer_list,
@@ -89,15 +97,79 @@ def get_customers():
             'has_prev': customers.has_prev
         }), 200
         
+    except (InvalidCursor, InvalidFieldset) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _contract_summaries(customer_ids):
+    """(contract_count, active_contracts_count) per customer in one grouped query"""
+    if not customer_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            Contract.customer_id,
+            func.count(Contract.contract_id),
+            func.coalesce(func.sum(case((Contract.status.in_(ACTIVE_CONTRACT_STATUSES), 1), else_=0)), 0)
+        ).where(Contract.customer_id.in_(customer_ids)).group_by(Contract.customer_id)
+    ).all()
+    return {customer_id: (count, int(active)) for customer_id, count, active in rows}
+
+def _contract_summary_columns():
+    """CUSTOMER_SUMMARY_FIELDS as correlated columns, so default list rows go to jsonify() as they are"""
+    def contract_count(*conditions):
+        return (
+            select(func.count(Contract.contract_id))
+            .where(Contract.customer_id == Customer.customer_id, *conditions)
+            .correlate(Customer)
+            .scalar_subquery()
+        )
+    contracts = contract_count()
+    active = contract_count(Contract.status.in_(ACTIVE_CONTRACT_STATUSES))
+    return (
+        contracts.label('contract_count'),
+        active.label('active_contracts_count'),
+        case((contracts == 0, 'No Contracts'), (active > 0, 'Active'), else_='Inactive').label('status_summary')
+    )
+
+def _customer_list(items, fieldset=None):
+    """Serialize a page of customers with lightweight contract aggregates for UI columns"""
+    if not fieldset:
+        # Column rows from the default list query, aggregates included
+        return items
+    if not any(fieldset.wants(name) for name in CUSTOMER_SUMMARY_FIELDS):
+        return [fieldset.serialize(c) for c in items]
+    summaries = _contract_summaries([c.customer_id for c in items])
+    customer_list = [fieldset.serialize(c) for c in items]
+
+    for customer_dict, item in zip(customer_list, items):
+        contract_count, active_contracts_count = summaries.get(item.customer_id, (0, 0))
+        customer_dict['contract_count'] = contract_count
+        customer_dict['active_contracts_count'] = active_contracts_count
+        customer_dict['status_summary'] = _status_summary(contract_count, active_contracts_count)
+        if fieldset.fields is not None:
+            for name in CUSTOMER_SUMMARY_FIELDS:
+                if not fieldset.wants(name):
+                    customer_dict.pop(name)
+    return customer_list
+
+def _status_summary(contract_count, active_contracts_count):
+    if contract_count == 0:
+        return 'No Contracts'
+    return 'Active' if active_contracts_count > 0 else 'Inactive'
+
 @customer_bp.route('/customers/<int:customer_id>', methods=['GET'])
 def get_customer(customer_id):
     """Get a specific customer by ID"""
     try:
+        fieldset = Fieldset.from_args(request.args, Customer)
+        if fieldset:
+            customer = fieldset.apply(Customer.query).filter(Customer.customer_id == customer_id).first_or_404()
+            return jsonify(fieldset.serialize(customer))
         customer = Customer.query.get_or_404(customer_id)
         return jsonify(customer.to_dict())
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -165,7 +237,10 @@ def delete_customer(customer_id):
     """Delete a customer"""
     try:
         customer = Customer.query.get_or_404(customer_id)
+        # Contracts and payments go with the customer (cascade)
+        revenue_months = customer_revenue_months([customer_id])
         db.session.delete(customer)
+        refresh_revenue_months(revenue_months)
         db.session.commit()
         
         return jsonify({'message': 'Customer deleted successfully'})
@@ -179,11 +254,21 @@ def get_contracts():
     """Get all contracts with optional filtering"""
     try:
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = min(request.args.get('per_page', 10, type=int), 100)  # Limit max 100
         customer_id = request.args.get('customer_id', type=int)
         status = request.args.get('status', '')
+        fieldset = Fieldset.from_args(request.args, Contract)
         
         query = Contract.query
+        if fieldset:
+            query = fieldset.apply(query)
+        else:
+            # Load the customer summary in the same SELECT instead of one query per contract
+            query = query.options(
+                joinedload(Contract.customer).load_only(
+                    Customer.customer_id, Customer.customer_name, Customer.company_name
+                )
+            )
         
         if customer_id:
             query = query.filter(Contract.customer_id == customer_id)
@@ -191,31 +276,50 @@ def get_contracts():
         if status:
             query = query.filter(Contract.status == status)
         
-        contracts = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [Contract.contract_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=wants_total(request.args)
+            )
+            contracts = None
+            page_items = result['items']
+        else:
+            # Stable ordering so pages never overlap or skip rows
+            contracts = query.order_by(Contract.contract_id).paginate(
+                page=page, per_page=per_page, error_out=False
+            )
+            page_items = contracts.items
         
         contracts_list = []
-        for contract in contracts.items:
+        for contract in page_items:
+            if fieldset:
+                contracts_list.append(fieldset.serialize(contract))
+                continue
             item = contract.to_dict()
-            try:
-                cust = Customer.query.get(contract.customer_id)
-                if cust:
-                    item['customer'] = {
-                        'customer_id': cust.customer_id,
-                        'customer_name': cust.customer_name,
-                        'company_name': cust.company_name
-                    }
-            except Exception:
-                pass
+            cust = contract.customer
+            if cust:
+                item['customer'] = {
+                    'customer_id': cust.customer_id,
+                    'customer_name': cust.customer_name,
+                    'company_name': cust.company_name
+                }
             contracts_list.append(item)
 
+        if contracts is None:
+            return jsonify(cursor_response(result, 'contracts', contracts_list))
+
         return jsonify({
             'contracts': contracts_list,
             'total': contracts.total,
             'pages': contracts.pages,
-            'current_page': page
+            'current_page': page,
+            'per_page': per_page,
+            'has_next': contracts.has_next,
+            'has_prev': contracts.has_prev
         })
+    except (InvalidCursor, InvalidFieldset) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -223,8 +327,14 @@ def get_contracts():
 def get_contract(contract_id):
     """Get a specific contract by ID"""
     try:
+        fieldset = Fieldset.from_args(request.args, Contract)
+        if fieldset:
+            contract = fieldset.apply(Contract.query).filter(Contract.contract_id == contract_id).first_or_404()
+            return jsonify(fieldset.serialize(contract))
         contract = Contract.query.get_or_404(contract_id)
         return jsonify(contract.to_dict())
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -246,7 +356,17 @@ def create_contract():
             additional_services=data.get('additional_services')
         )
         
+        # An initial amount paid opens the contract's payment ledger
+        opening = Decimal(str(contract.amount_paid or 0))
+        if opening:
+            paid_at = contract.last_payment_date or date.today()
+            contract.payments.append(Payment(amount=opening, paid_at=paid_at, method='opening_balance'))
+            if opening > 0:
+                # Same rule as record_payments: a payment in sets last_payment_date
+                contract.last_payment_date = paid_at
+        
         db.session.add(contract)
+        refresh_revenue_months({contract.contract_start_date, contract.last_payment_date or date.today()})
         db.session.commit()
         
         # Generate alerts for this contract
@@ -263,22 +383,45 @@ def update_contract(contract_id):
     try:
         contract = Contract.query.get_or_404(contract_id)
         data = request.get_json()
+        revenue_key = (contract.contract_type, contract.contract_value, contract.contract_start_date)
+        old_start_date = contract.contract_start_date
         
         contract.contract_type = data.get('contract_type', contract.contract_type)
         contract.contract_value = data.get('contract_value', contract.contract_value)
         contract.contract_start_date = datetime.strptime(data.get('contract_start_date'), '%Y-%m-%d').date() if data.get('contract_start_date') else contract.contract_start_date
+        old_end_date = contract.contract_end_date
         contract.contract_end_date = datetime.strptime(data.get('contract_end_date'), '%Y-%m-%d').date() if data.get('contract_end_date') else contract.contract_end_date
+        old_amount_paid = Decimal(str(contract.amount_paid or 0))
         contract.amount_paid = data.get('amount_paid', contract.amount_paid)
         contract.last_payment_date = datetime.strptime(data.get('last_payment_date'), '%Y-%m-%d').date() if data.get('last_payment_date') else contract.last_payment_date
+        # Keep the ledger in step when amount_paid is edited directly
+        adjustment = Decimal(str(contract.amount_paid or 0)) - old_amount_paid
+        if adjustment:
+            paid_at = contract.last_payment_date or date.today()
+            db.session.add(Payment(
+                contract_id=contract.contract_id,
+                amount=adjustment,
+                paid_at=paid_at,
+                method='adjustment',
+                notes='amount_paid edited on the contract'
+            ))
+            if adjustment > 0:
+                # Same rule as record_payments: a payment in sets last_payment_date
+                contract.last_payment_date = paid_at
         contract.status = data.get('status', contract.status)
         contract.additional_services = data.get('additional_services', contract.additional_services)
         contract.updated_at = datetime.utcnow()
         
-        db.session.commit()
+        # Alerts only depend on the end date; adjust them in the same transaction
+        if contract.contract_end_date != old_end_date:
+            reconcile_payment_alerts(contract)
         
-        # Regenerate alerts for this contract
-        Alert.query.filter_by(contract_id=contract_id).delete()
-        generate_payment_alerts(contract)
+        # Refresh the revenue rollup for every month this contract feeds
+        if adjustment or revenue_key != (contract.contract_type, contract.contract_value, contract.contract_start_date):
+            db.session.flush()
+            refresh_revenue_months(contract_revenue_months(contract.contract_id) | {old_start_date})
+        
+        db.session.commit()
         
         return jsonify(contract.to_dict())
     except Exception as e:
@@ -290,7 +433,9 @@ def delete_contract(contract_id):
     """Delete a contract"""
     try:
         contract = Contract.query.get_or_404(contract_id)
+        revenue_months = contract_revenue_months(contract_id)
         db.session.delete(contract)
+        refresh_revenue_months(revenue_months)
         db.session.commit()
         
         return jsonify({'message': 'Contract deleted successfully'})
@@ -301,45 +446,93 @@ def delete_contract(contract_id):
 # Alert management
 @customer_bp.route('/alerts/upcoming', methods=['GET'])
 def get_upcoming_alerts():
-    """Get upcoming payment alerts"""
+    """Get upcoming payment alerts.
+
+    Optional filters: date_from / date_to (YYYY-MM-DD, date_from defaults to today)
+    and alert_type (comma separated). Passing page/per_page or cursor returns a
+    paginated envelope. Otherwise the legacy plain array is returned, capped at
+    MAX_PER_PAGE alerts with a Link header (rel="next") to the following cursor
+    page; ?all=1 returns every alert.
+    """
     try:
-        today = date.today()
-        alerts = Alert.query.filter(
-            Alert.alert_date >= today,
-            Alert.is_sent == False
-        ).order_by(Alert.alert_date).all()
-        
-        enriched = []
-        for alert in alerts:
-            item = alert.to_dict()
-            # Chuẩn hóa alert_date về dạng YYYY-MM-DD (tránh lệch timezone ở frontend)
-            if item.get('alert_date'):
-                try:
-                    item['alert_date'] = str(item['alert_date']).split('T')[0]
-                except Exception:
-                    pass
-            # Bổ sung thông tin customer tối thiểu cho contract
-            try:
-                contract = Contract.query.get(alert.contract_id)
-                if contract:
-                    cust = Customer.query.get(contract.customer_id)
-                    contract_dict = contract.to_dict()
-                    if cust:
-                        contract_dict['customer'] = {
-                            'customer_id': cust.customer_id,
-                            'customer_name': cust.customer_name,
-                            'company_name': cust.company_name,
-                            'email': cust.email
-                        }
-                    item['contract'] = contract_dict
-            except Exception:
-                pass
-            enriched.append(item)
-
-        return jsonify(enriched)
+        date_from = date_arg('date_from', date.today())
+        date_to = date_arg('date_to')
+        alert_types = [t for t in request.args.get('alert_type', '').split(',') if t]
+        fieldset = Fieldset.from_args(request.args, Alert)
+        
+        # Served by the (is_sent, alert_date) index
+        query = Alert.query.filter(
+            Alert.is_sent == False,
+            Alert.alert_date >= date_from
+        )
+        if date_to:
+            query = query.filter(Alert.alert_date <= date_to)
+        if alert_types:
+            query = query.filter(Alert.alert_type.in_(alert_types))
+        
+        if fieldset:
+            query = fieldset.apply(query)
+            serialize = fieldset.serialize
+        else:
+            # Alert, contract and customer summary in one joined SELECT
+            query = query.join(Alert.contract).join(Contract.customer).options(
+                contains_eager(Alert.contract).contains_eager(Contract.customer)
+            )
+            serialize = _upcoming_alert_item
+        
+        per_page = min(request.args.get('per_page', 50, type=int), 100)  # Limit max 100
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [Alert.alert_date, Alert.alert_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=wants_total(request.args)
+            )
+            return jsonify(cursor_response(result, 'alerts', [serialize(a) for a in result['items']]))
+        
+        query = query.order_by(Alert.alert_date, Alert.alert_id)
+        if 'page' in request.args or 'per_page' in request.args:
+            page = request.args.get('page', 1, type=int)
+            alerts = query.paginate(page=page, per_page=per_page, error_out=False)
+            return jsonify({
+                'alerts': [serialize(a) for a in alerts.items],
+                'total': alerts.total,
+                'pages': alerts.pages,
+                'current_page': page,
+                'per_page': per_page,
+                'has_next': alerts.has_next,
+                'has_prev': alerts.has_prev
+            })
+        if wants_all(request.args):
+            return jsonify([serialize(a) for a in query.all()])
+        
+        # Legacy plain array, first page only
+        result = keyset_paginate(query, [Alert.alert_date, Alert.alert_id], per_page=MAX_PER_PAGE)
+        response = jsonify([serialize(a) for a in result['items']])
+        link = next_page_link(result)
+        if link:
+            response.headers['Link'] = link
+        return response
+    except (InvalidCursor, InvalidFieldset, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _upcoming_alert_item(alert):
+    """Alert with its contract and a minimal customer summary (relations already loaded)"""
+    item = alert.to_dict()
+    contract = alert.contract
+    if contract:
+        # Bổ sung thông tin customer tối thiểu cho contract
+        cust = contract.customer
+        if cust:
+            item['contract']['customer'] = {
+                'customer_id': cust.customer_id,
+                'customer_name': cust.customer_name,
+                'company_name': cust.company_name,
+                'email': cust.email
+            }
+    return item
+
 @customer_bp.route('/alerts/<int:alert_id>/mark_sent', methods=['POST'])
 def mark_alert_sent(alert_id):
     """Mark an alert as sent"""
@@ -353,6 +546,78 @@ def mark_alert_sent(alert_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@customer_bp.route('/alerts/mark_sent', methods=['POST'])
+def bulk_mark_alerts_sent():
+    """Mark many alerts as sent with one UPDATE.
+
+    Body: {"alert_ids": [...]} or {"filter": {"date_to": "YYYY-MM-DD",
+    "date_from": ..., "alert_type": "a,b", "customer_id": n}}.
+    """
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_alert_conditions(Alert, data, {
+            'customer_id': lambda value: Alert.contract_id.in_(
+                select(Contract.contract_id).where(Contract.customer_id == int(value))
+            )
+        })
+        result = db.session.execute(
+            update(Alert).where(*conditions).values(is_sent=True)
+        )
+        db.session.commit()
+        return jsonify({'message': 'Alerts marked as sent', 'updated': result.rowcount})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+BULK_ALERT_FILTER_KEYS = ('date_from', 'date_to', 'alert_type')
+
+def bulk_alert_conditions(model, data, extra_filters=None):
+    """WHERE clauses for a bulk alert update from an id list or a filter object.
+
+    extra_filters maps additional filter keys to a function building their
+    condition from the value. Unknown keys, and requests that would select
+    every unsent alert, raise ValueError.
+    """
+    extra_filters = extra_filters or {}
+    alert_ids = data.get('alert_ids')
+    filters = data.get('filter')
+    if not alert_ids and not filters:
+        raise ValueError('Provide alert_ids or filter')
+    conditions = [model.is_sent == False]
+    if alert_ids:
+        if not isinstance(alert_ids, list):
+            raise ValueError('alert_ids must be a list')
+        try:
+            conditions.append(model.alert_id.in_([int(i) for i in alert_ids]))
+        except (TypeError, ValueError):
+            raise ValueError('alert_ids must be a list of integers')
+    if filters:
+        if not isinstance(filters, dict):
+            raise ValueError('filter must be an object')
+        unknown = set(filters) - set(BULK_ALERT_FILTER_KEYS) - set(extra_filters)
+        if unknown:
+            raise ValueError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+        if filters.get('date_from'):
+            conditions.append(model.alert_date >= parse_date(filters['date_from'], 'date_from'))
+        if filters.get('date_to'):
+            conditions.append(model.alert_date <= parse_date(filters['date_to'], 'date_to'))
+        if filters.get('alert_type'):
+            alert_types = filters['alert_type']
+            if isinstance(alert_types, str):
+                alert_types = alert_types.split(',')
+            if not isinstance(alert_types, list) or not all(isinstance(t, str) for t in alert_types):
+                raise ValueError('alert_type must be a comma separated string or a list of strings')
+            conditions.append(model.alert_type.in_(alert_types))
+        for key, condition in extra_filters.items():
+            if filters.get(key) not in (None, ''):
+                conditions.append(condition(filters[key]))
+    if len(conditions) == 1:
+        raise ValueError('filter must contain at least one condition')
+    return conditions
+
 # Web booking
 @customer_bp.route('/web-bookings', methods=['POST'])
 def create_web_booking():
@@ -396,63 +661,104 @@ def create_web_booking():
 # Dashboard statistics
 @customer_bp.route('/dashboard/stats', methods=['GET'])
 def get_dashboard_stats():
-    """Get dashboard statistics"""
+    """Get dashboard statistics (cached for DASHBOARD_CACHE_TTL seconds)"""
     try:
-        total_customers = Customer.query.count()
-        total_contracts = Contract.query.count()
-        active_contracts = Contract.query.filter(Contract.status.in_(['Khách book', 'Khách đã thanh toán'])).count()
-        
-        # Calculate total revenue and outstanding amounts
-        contracts = Contract.query.all()
-        total_revenue = sum(float(contract.amount_paid) for contract in contracts)
-        total_outstanding = sum(contract.calculate_amount_due() for contract in contracts)
-        
-        # Get upcoming alerts count
-        today = date.today()
-        upcoming_alerts = Alert.query.filter(
-            Alert.alert_date >= today,
-            Alert.is_sent == False
-        ).count()
-        
-        return jsonify({
-            'total_customers': total_customers,
-            'total_contracts': total_contracts,
-            'active_contracts': active_contracts,
-            'total_revenue': total_revenue,
-            'total_outstanding': total_outstanding,
-            'upcoming_alerts': upcoming_alerts
-        })
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 10)
+        stats = dashboard_cache.get_or_compute('dashboard_stats', _compute_dashboard_stats, ttl=ttl)
+        return jsonify(stats)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _compute_dashboard_stats():
+    """All dashboard figures in a single aggregate query"""
+    today = date.today()
+    total_customers = select(func.count(Customer.customer_id)).scalar_subquery()
+    upcoming_alerts = select(func.count(Alert.alert_id)).where(
+        Alert.is_sent == False,
+        Alert.alert_date >= today
+    ).scalar_subquery()
+    row = db.session.execute(
+        select(
+            total_customers,
+            func.count(Contract.contract_id),
+            func.coalesce(func.sum(case((Contract.status.in_(ACTIVE_CONTRACT_STATUSES), 1), else_=0)), 0),
+            sum_cents(Contract.amount_paid),
+            sum_cents(Contract.contract_value) - sum_cents(Contract.amount_paid),
+            upcoming_alerts
+        ).select_from(Contract)
+    ).one()
+    # Exact Decimal totals; AppJSONProvider writes them as JSON numbers
+    return {
+        'total_customers': row[0],
+        'total_contracts': row[1],
+        'active_contracts': int(row[2]),
+        'total_revenue': cents_to_decimal(row[3]),
+        'total_outstanding': cents_to_decimal(row[4]),
+        'upcoming_alerts': row[5]
+    }
+
+# Payment alerts relative to the contract end date (the payment due date)
+PAYMENT_ALERT_PERIODS = [
+    ('2_weeks_before', 14),
+    ('1_week_before', 7),
+    ('3_days_before', 3),
+    ('due_date', 0)
+]
+
+def payment_alert_rows(contract_id, due_date, today=None):
+    """Alert rows (plain dicts) a contract should have; only future dates are kept"""
+    today = today or date.today()
+    rows = []
+    for alert_type, days_before in PAYMENT_ALERT_PERIODS:
+        alert_date = due_date - timedelta(days=days_before)
+        if alert_date >= today:
+            rows.append({
+                'contract_id': contract_id,
+                'alert_date': alert_date,
+                'alert_type': alert_type
+            })
+    return rows
+
 def generate_payment_alerts(contract):
     """Generate payment alerts for a contract"""
     try:
         # Use contract end date as the payment due date
-        due_date = contract.contract_end_date
-        
-        # Generate alerts for different time periods
-        alert_periods = [
-            ('2_weeks_before', 14),
-            ('1_week_before', 7),
-            ('3_days_before', 3),
-            ('due_date', 0)
-        ]
-        
-        for alert_type, days_before in alert_periods:
-            alert_date = due_date - timedelta(days=days_before)
-            
-            # Only create alerts for future dates
-            if alert_date >= date.today():
-                alert = Alert(
-                    contract_id=contract.contract_id,
-                    alert_date=alert_date,
-                    alert_type=alert_type
-                )
-                db.session.add(alert)
+        for row in payment_alert_rows(contract.contract_id, contract.contract_end_date):
+            db.session.add(Alert(**row))
         
         db.session.commit()
     except Exception as e:
         db.session.rollback()
         print(f"Error generating alerts: {e}")
 
+def reconcile_payment_alerts(contract):
+    """Bring a contract's alerts in line with its end date without committing.
+
+    Only the difference is written: unsent alerts whose date no longer matches
+    a rule are deleted and missing future alerts are inserted. Matching and
+    already-sent alerts are left untouched, so is_sent history survives.
+    Returns (inserted, deleted).
+    """
+    due_date = contract.contract_end_date
+    expected = {
+        (alert_type, due_date - timedelta(days=days_before))
+        for alert_type, days_before in PAYMENT_ALERT_PERIODS
+    }
+    existing = db.session.execute(
+        select(Alert.alert_id, Alert.alert_type, Alert.alert_date, Alert.is_sent)
+        .where(Alert.contract_id == contract.contract_id)
+    ).all()
+    present = {(row.alert_type, row.alert_date) for row in existing}
+    stale_ids = [
+        row.alert_id for row in existing
+        if not row.is_sent and (row.alert_type, row.alert_date) not in expected
+    ]
+    missing = [
+        row for row in payment_alert_rows(contract.contract_id, due_date)
+        if (row['alert_type'], row['alert_date']) not in present
+    ]
+    if stale_ids:
+        db.session.execute(delete(Alert).where(Alert.alert_id.in_(stale_ids)))
+    if missing:
+        db.session.execute(insert(Alert), missing)
+    return len(missing), len(stale_ids)
@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+from datetime import datetime, date
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from sqlalchemy import select, exists
+
+from src.models.user import db
+from src.models.customer import Customer, Contract
+from src.models.room import Room, RoomBooking
+from src.serializers import json_value, date_arg
+
+export_bp = Blueprint('exports', __name__)
+
+EXPORT_YIELD_PER = 1000  # rows fetched from the server-side cursor at a time
+
+
+def _customer_export(date_from, date_to, status, branch_id):
+    columns = [c for c in Customer.__table__.columns]
+    stmt = select(*columns).order_by(Customer.customer_id)
+    if date_from:
+        stmt = stmt.where(Customer.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        stmt = stmt.where(Customer.created_at <= datetime.combine(date_to, datetime.max.time()))
+    if status:
+        stmt = stmt.where(exists().where(
+            Contract.customer_id == Customer.customer_id, Contract.status == status
+        ))
+    if branch_id:
+        stmt = stmt.where(exists().where(
+            RoomBooking.customer_id == Customer.customer_id,
+            RoomBooking.room_id == Room.room_id,
+            Room.branch_id == branch_id
+        ))
+    return stmt
+
+
+def _contract_export(date_from, date_to, status, branch_id):
+    columns = [c for c in Contract.__table__.columns]
+    stmt = select(*columns, Customer.customer_name, Customer.company_name).join(
+        Customer, Customer.customer_id == Contract.customer_id
+    ).order_by(Contract.contract_id)
+    if date_from:
+        stmt = stmt.where(Contract.contract_start_date >= date_from)
+    if date_to:
+        stmt = stmt.where(Contract.contract_start_date <= date_to)
+    if status:
+        stmt = stmt.where(Contract.status == status)
+    if branch_id:
+        raise ValueError('branch_id filter is not supported for contracts')
+    return stmt
+
+
+def _booking_export(date_from, date_to, status, branch_id):
+    columns = [c for c in RoomBooking.__table__.columns]
+    stmt = select(*columns, Room.branch_id, Room.room_number).join(
+        Room, Room.room_id == RoomBooking.room_id
+    ).order_by(RoomBooking.booking_id)
+    if date_from:
+        stmt = stmt.where(RoomBooking.rental_start_date >= date_from)
+    if date_to:
+        stmt = stmt.where(RoomBooking.rental_start_date <= date_to)
+    if status:
+        stmt = stmt.where(RoomBooking.status == status)
+    if branch_id:
+        stmt = stmt.where(Room.branch_id == branch_id)
+    return stmt
+
+
+# Date filters apply to customers.created_at, contracts.contract_start_date
+# and room_bookings.rental_start_date respectively
+EXPORTS = {
+    'customers': _customer_export,
+    'contracts': _contract_export,
+    'room-bookings': _booking_export,
+}
+
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None:
+        return ''
+    return value
+
+
+def stream_rows(stmt, fmt):
+    """Yield encoded chunks straight from a server-side cursor; memory stays flat"""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_YIELD_PER))
+    keys = list(result.keys())
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(keys)
+        for rows in result.partitions():
+            for row in rows:
+                writer.writerow([_csv_value(v) for v in row])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for rows in result.partitions():
+            yield ''.join(
+                json.dumps(dict(zip(keys, map(json_value, row))), ensure_ascii=False) + '\n'
+                for row in rows
+            )
+    result.close()
+
+
+@export_bp.route('/export/<entity>', methods=['GET'])
+def export_entity(entity):
+    """Stream customers, contracts or room-bookings as CSV (default) or NDJSON.
+
+    Filters: date_from, date_to (YYYY-MM-DD), status, branch_id.
+    """
+    try:
+        if entity not in EXPORTS:
+            return jsonify({'error': f'Unsupported export entity: {entity}'}), 404
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+        stmt = EXPORTS[entity](
+            date_arg('date_from'),
+            date_arg('date_to'),
+            request.args.get('status'),
+            request.args.get('branch_id', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filename = f"{entity}_{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(stream_rows(stmt, fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
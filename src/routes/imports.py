@@ -0,0 +1,255 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import insert, select
+
+from src.models.user import db
+from src.models.customer import Customer, Contract, Alert, Payment
+from src.routes.customer import payment_alert_rows
+from src.jobs.revenue import refresh_revenue_months
+from src.serializers import parse_date
+
+import_bp = Blueprint('imports', __name__)
+
+IMPORT_BATCH_SIZE = 1000  # rows per INSERT ... executemany and per transaction
+MAX_REPORTED_ERRORS = 1000
+
+CUSTOMER_FIELDS = (
+    'customer_name', 'company_name', 'tax_id', 'nationality', 'business_type',
+    'enterprise_type', 'id_card', 'email', 'mobile', 'zalo', 'whatsapp', 'kakao', 'notes'
+)
+
+
+def _parse_decimal(value, field):
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'{field} must be a number')
+    if not amount.is_finite():
+        raise ValueError(f'{field} must be a number')
+    return amount
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def validate_customer_row(record):
+    if _blank(record.get('customer_name')):
+        raise ValueError('customer_name is required')
+    return {
+        field: (record.get(field) if not _blank(record.get(field)) else None)
+        for field in CUSTOMER_FIELDS
+    }
+
+
+def validate_contract_row(record):
+    for field in ('customer_id', 'contract_type', 'contract_value', 'contract_start_date', 'contract_end_date'):
+        if _blank(record.get(field)):
+            raise ValueError(f'{field} is required')
+    try:
+        customer_id = int(record['customer_id'])
+    except (TypeError, ValueError):
+        raise ValueError('customer_id must be an integer')
+    start = parse_date(record['contract_start_date'], 'contract_start_date')
+    end = parse_date(record['contract_end_date'], 'contract_end_date')
+    if end < start:
+        raise ValueError('contract_end_date is before contract_start_date')
+    return {
+        'customer_id': customer_id,
+        'contract_type': record['contract_type'],
+        'contract_value': _parse_decimal(record['contract_value'], 'contract_value'),
+        'contract_start_date': start,
+        'contract_end_date': end,
+        'amount_paid': _parse_decimal(record['amount_paid'], 'amount_paid') if not _blank(record.get('amount_paid')) else Decimal('0'),
+        'last_payment_date': parse_date(record['last_payment_date'], 'last_payment_date') if not _blank(record.get('last_payment_date')) else None,
+        'status': record.get('status') or 'Khách hỏi',
+        'additional_services': record.get('additional_services') or None
+    }
+
+
+def insert_customer_batch(batch):
+    """Insert validated customer rows; returns per-row errors (none expected)"""
+    db.session.execute(insert(Customer), [row for _, row in batch])
+    return [], 0
+
+
+def insert_contract_batch(batch):
+    """Insert validated contract rows plus their opening payments and alerts in the current transaction"""
+    customer_ids = {row['customer_id'] for _, row in batch}
+    existing = set(db.session.scalars(
+        select(Customer.customer_id).where(Customer.customer_id.in_(customer_ids))
+    ))
+    errors = [
+        {'row': line, 'error': f"customer {row['customer_id']} does not exist"}
+        for line, row in batch if row['customer_id'] not in existing
+    ]
+    rows = [row for _, row in batch if row['customer_id'] in existing]
+    if not rows:
+        return errors, 0
+    for row in rows:
+        # The opening payment below is dated _opening_payment_date(); the contract reports the same date
+        if row['amount_paid'] > 0:
+            row['last_payment_date'] = _opening_payment_date(row)
+    inserted = db.session.execute(
+        insert(Contract).returning(Contract.contract_id, Contract.contract_end_date, sort_by_parameter_order=True),
+        rows
+    ).all()
+    # An initial amount paid opens the contract's payment ledger, as in create_contract
+    payment_rows = [
+        {
+            'contract_id': contract_id,
+            'amount': row['amount_paid'],
+            'paid_at': _opening_payment_date(row),
+            'method': 'opening_balance'
+        }
+        for (contract_id, _), row in zip(inserted, rows) if row['amount_paid']
+    ]
+    if payment_rows:
+        db.session.execute(insert(Payment), payment_rows)
+    alert_rows = []
+    for contract_id, end_date in inserted:
+        alert_rows.extend(payment_alert_rows(contract_id, end_date))
+    if alert_rows:
+        db.session.execute(insert(Alert), alert_rows)
+    return errors, len(alert_rows)
+
+
+def _opening_payment_date(row):
+    return row['last_payment_date'] or date.today()
+
+
+IMPORTERS = {
+    'customers': (validate_customer_row, insert_customer_batch),
+    'contracts': (validate_contract_row, insert_contract_batch),
+}
+
+
+def _detect_format(upload_name):
+    fmt = request.args.get('format', '').lower()
+    if fmt in ('csv', 'ndjson'):
+        return fmt
+    mimetype = request.mimetype or ''
+    if upload_name:
+        if upload_name.lower().endswith('.csv'):
+            return 'csv'
+        if upload_name.lower().endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-lines'):
+        return 'ndjson'
+    return None
+
+
+def iter_records(binary_stream, fmt):
+    """Yield (line number, record dict or exception) without reading the whole upload"""
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f'invalid JSON: {e}')
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ValueError('each line must be a JSON object')
+            continue
+        yield line_no, record
+
+
+def run_import(entity, records, batch_size=IMPORT_BATCH_SIZE):
+    """Validate records as they stream in and insert them in bounded transactions"""
+    validate, insert_batch = IMPORTERS[entity]
+    summary = {'entity': entity, 'processed': 0, 'inserted': 0, 'failed': 0, 'alerts_created': 0, 'errors': []}
+    revenue_months = set()
+
+    def record_error(line, message):
+        summary['failed'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'row': line, 'error': message})
+
+    def flush(batch):
+        try:
+            errors, alerts_created = insert_batch(batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for line, _ in batch:
+                record_error(line, f'batch failed: {e}')
+            return
+        for error in errors:
+            record_error(error['row'], error['error'])
+        summary['inserted'] += len(batch) - len(errors)
+        summary['alerts_created'] += alerts_created
+        if entity == 'contracts':
+            revenue_months.update(row['contract_start_date'] for _, row in batch)
+            revenue_months.update(_opening_payment_date(row) for _, row in batch if row['amount_paid'])
+
+    batch = []
+    for line, record in records:
+        summary['processed'] += 1
+        if isinstance(record, Exception):
+            record_error(line, str(record))
+            continue
+        try:
+            batch.append((line, validate(record)))
+        except ValueError as e:
+            record_error(line, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    # One rollup refresh for the whole import rather than one per batch
+    if revenue_months:
+        try:
+            refresh_revenue_months(revenue_months)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            summary['revenue_rollup_error'] = str(e)
+    summary['errors_truncated'] = summary['failed'] > len(summary['errors'])
+    return summary
+
+
+@import_bp.route('/import/<entity>', methods=['POST'])
+def bulk_import(entity):
+    """Bulk import customers or contracts from a CSV or NDJSON upload.
+
+    The body may be the raw file (Content-Type text/csv or application/x-ndjson,
+    or ?format=csv|ndjson) or a multipart form with a `file` field. Rows are
+    validated one by one; invalid rows are reported and skipped without
+    aborting the rest of the file.
+    """
+    try:
+        if entity not in IMPORTERS:
+            return jsonify({'error': f'Unsupported import entity: {entity}'}), 404
+
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+        fmt = _detect_format(upload.filename if upload else None)
+        if fmt is None:
+            return jsonify({'error': 'Unknown format, use ?format=csv or ?format=ndjson'}), 400
+
+        stream = upload.stream if upload else io.BufferedReader(request.stream)
+        batch_size = current_app.config.get('IMPORT_BATCH_SIZE', IMPORT_BATCH_SIZE)
+        summary = run_import(entity, iter_records(stream, fmt), batch_size=batch_size)
+        status_code = 200 if summary['inserted'] or not summary['failed'] else 422
+        return jsonify(summary), status_code
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': 'Upload must be UTF-8 encoded'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
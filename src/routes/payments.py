@@ -0,0 +1,173 @@
+from collections import defaultdict
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import insert, update, select, bindparam, case, func
+
+from src.models.user import db
+from src.models.customer import Contract, Payment
+from src.jobs.revenue import refresh_revenue_months
+from src.serializers import parse_date
+
+payment_bp = Blueprint('payments', __name__)
+
+MAX_BATCH_PAYMENTS = 5000
+
+
+def validate_payment(data, contract_id=None):
+    """Normalize one payment payload into an insertable row; raises ValueError"""
+    contract_id = contract_id or data.get('contract_id')
+    try:
+        contract_id = int(contract_id)
+    except (TypeError, ValueError):
+        raise ValueError('contract_id is required')
+    try:
+        amount = Decimal(str(data.get('amount')))
+    except (InvalidOperation, TypeError):
+        raise ValueError('amount must be a number')
+    if not amount.is_finite() or amount == 0:
+        raise ValueError('amount must be a non-zero number')
+    paid_at = parse_date(data['paid_at'], 'paid_at') if data.get('paid_at') else date.today()
+    return {
+        'contract_id': contract_id,
+        'amount': amount.quantize(Decimal('0.01')),
+        'paid_at': paid_at,
+        'method': data.get('method'),
+        'reference': data.get('reference'),
+        'notes': data.get('notes')
+    }
+
+
+def record_payments(rows):
+    """Insert ledger rows and roll them into contracts.amount_paid / last_payment_date.
+
+    The rollup is incremental: one executemany UPDATE adds each contract's
+    batch total, so balances never need to re-read payment history. The
+    monthly revenue rollup is refreshed for the months paid into. Runs in
+    the caller's transaction (no commit).
+    """
+    if not rows:
+        return
+    totals = defaultdict(Decimal)
+    latest = {}
+    for row in rows:
+        totals[row['contract_id']] += row['amount']
+        if row['amount'] > 0 and (row['contract_id'] not in latest or row['paid_at'] > latest[row['contract_id']]):
+            latest[row['contract_id']] = row['paid_at']
+
+    db.session.execute(insert(Payment), rows)
+    contracts = Contract.__table__
+    db.session.execute(
+        update(contracts)
+        .where(contracts.c.contract_id == bindparam('b_contract_id'))
+        .values(
+            amount_paid=func.round(func.coalesce(contracts.c.amount_paid, 0) + bindparam('b_amount', type_=db.Numeric(18, 2)), 2),
+            last_payment_date=case(
+                (bindparam('b_paid_at', type_=db.Date) == None, contracts.c.last_payment_date),
+                (contracts.c.last_payment_date == None, bindparam('b_paid_at', type_=db.Date)),
+                (contracts.c.last_payment_date < bindparam('b_paid_at', type_=db.Date), bindparam('b_paid_at', type_=db.Date)),
+                else_=contracts.c.last_payment_date
+            ),
+            updated_at=datetime.utcnow()
+        ),
+        [
+            {'b_contract_id': contract_id, 'b_amount': total, 'b_paid_at': latest.get(contract_id)}
+            for contract_id, total in totals.items()
+        ]
+    )
+    refresh_revenue_months({row['paid_at'] for row in rows})
+
+
+def _missing_contracts(contract_ids):
+    found = set(db.session.scalars(
+        select(Contract.contract_id).where(Contract.contract_id.in_(contract_ids))
+    ))
+    return [cid for cid in contract_ids if cid not in found]
+
+
+@payment_bp.route('/contracts/<int:contract_id>/payments', methods=['GET'])
+def get_contract_payments(contract_id):
+    """Payment history for a contract, newest first (served by the (contract_id, paid_at) index)"""
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 20, type=int), 100)  # Limit max 100
+        contract = Contract.query.get_or_404(contract_id)
+        payments = Payment.query.filter(Payment.contract_id == contract_id).order_by(
+            Payment.paid_at.desc(), Payment.payment_id.desc()
+        ).paginate(page=page, per_page=per_page, error_out=False)
+        return jsonify({
+            'contract_id': contract_id,
+            'amount_paid': float(contract.amount_paid or 0),
+            'amount_due': contract.calculate_amount_due(),
+            'last_payment_date': contract.last_payment_date.isoformat() if contract.last_payment_date else None,
+            'payments': [payment.to_dict() for payment in payments.items],
+            'total': payments.total,
+            'pages': payments.pages,
+            'current_page': page
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@payment_bp.route('/contracts/<int:contract_id>/payments', methods=['POST'])
+def create_contract_payment(contract_id):
+    """Post one payment against a contract"""
+    try:
+        Contract.query.get_or_404(contract_id)
+        row = validate_payment(request.get_json() or {}, contract_id)
+        record_payments([row])
+        db.session.commit()
+        contract = db.session.get(Contract, contract_id)
+        db.session.refresh(contract)
+        return jsonify({
+            'message': 'Payment recorded',
+            'contract': contract.to_dict()
+        }), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@payment_bp.route('/payments/batch', methods=['POST'])
+def create_payments_batch():
+    """Post many payments at once: {"payments": [{contract_id, amount, paid_at, ...}]}.
+
+    The batch is all-or-nothing; validation errors are returned per index.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('payments')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Missing or invalid payments array'}), 400
+        if len(items) > MAX_BATCH_PAYMENTS:
+            return jsonify({'error': f'At most {MAX_BATCH_PAYMENTS} payments per batch'}), 400
+
+        rows, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                rows.append(validate_payment(item if isinstance(item, dict) else {}))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+        if not errors:
+            missing = set(_missing_contracts({row['contract_id'] for row in rows}))
+            errors = [
+                {'index': index, 'error': f"contract {row['contract_id']} does not exist"}
+                for index, row in enumerate(rows) if row['contract_id'] in missing
+            ]
+        if errors:
+            return jsonify({'error': 'Invalid payments', 'errors': errors}), 400
+
+        record_payments(rows)
+        db.session.commit()
+        return jsonify({
+            'message': 'Payments recorded',
+            'recorded': len(rows),
+            'contracts_updated': len({row['contract_id'] for row in rows})
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,241 @@
+from datetime import date, datetime
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import select, func, case, cast
+
+from src.models.user import db
+from src.models.customer import Customer, Contract, PaymentRequest
+from src.models.room import Branch
+from src.models.revenue import RevenueMonthly
+from src.jobs.revenue import customer_branches, month_start, next_month
+from src.cache import TTLCache
+
+reports_bp = Blueprint('reports', __name__)
+
+AGING_BUCKETS = ('current', 'days_1_30', 'days_31_60', 'days_61_90', 'days_90_plus')
+AGING_SOURCES = ('contracts', 'payment_requests')
+
+# Aging figures are recomputed once per day (the cache key carries the date)
+aging_cache = TTLCache(ttl=24 * 60 * 60)
+
+
+def _bucket_sums(days_past_due, amount):
+    """Conditional SUMs of `amount` (in integer cents) for each aging bucket"""
+    cents = func.round(amount * 100)
+    conditions = (
+        days_past_due <= 0,
+        (days_past_due > 0) & (days_past_due <= 30),
+        (days_past_due > 30) & (days_past_due <= 60),
+        (days_past_due > 60) & (days_past_due <= 90),
+        days_past_due > 90,
+    )
+    return [
+        func.coalesce(func.sum(case((condition, cents), else_=0)), 0).label(name)
+        for name, condition in zip(AGING_BUCKETS, conditions)
+    ]
+
+
+def _aging_query(source, today):
+    if source == 'contracts':
+        due = Contract.contract_end_date
+        amount = func.coalesce(Contract.contract_value, 0) - func.coalesce(Contract.amount_paid, 0)
+        customer_fk = Contract.customer_id
+        conditions = [amount > 0]
+    else:
+        due = func.date(PaymentRequest.due_date)
+        amount = func.coalesce(PaymentRequest.total_rental_amount, 0)
+        customer_fk = PaymentRequest.customer_id
+        conditions = [func.coalesce(PaymentRequest.status, 'pending').notin_(('paid', 'cancelled')), amount > 0]
+    days_past_due = func.julianday(today) - func.julianday(due)
+    branches = customer_branches()
+    return (
+        select(
+            Customer.customer_id,
+            Customer.customer_name,
+            branches.c.branch_id,
+            *_bucket_sums(days_past_due, amount)
+        )
+        .join(Customer, Customer.customer_id == customer_fk)
+        .outerjoin(branches, branches.c.customer_id == Customer.customer_id)
+        .where(*conditions)
+        .group_by(Customer.customer_id, Customer.customer_name, branches.c.branch_id)
+        .order_by(Customer.customer_name, Customer.customer_id)
+    )
+
+
+def compute_aging(source, today=None):
+    """Aging buckets per customer and per branch from one grouped query"""
+    today = today or date.today()
+    rows = db.session.execute(_aging_query(source, today)).all()
+
+    def empty():
+        return {name: 0 for name in AGING_BUCKETS + ('total',)}
+
+    branch_names = dict(db.session.execute(select(Branch.branch_id, Branch.branch_name)).all()) if rows else {}
+    customers = []
+    branches = {}
+    totals = empty()
+    for row in rows:
+        item = {
+            'customer_id': row.customer_id,
+            'customer_name': row.customer_name,
+            'branch_id': row.branch_id
+        }
+        branch = branches.setdefault(row.branch_id, dict(
+            branch_id=row.branch_id,
+            branch_name=branch_names.get(row.branch_id),
+            customers=0,
+            **empty()
+        ))
+        branch['customers'] += 1
+        row_total = 0
+        for name in AGING_BUCKETS:
+            cents = int(getattr(row, name))
+            item[name] = cents / 100
+            branch[name] += cents
+            totals[name] += cents
+            row_total += cents
+        item['total'] = row_total / 100
+        branch['total'] += row_total
+        totals['total'] += row_total
+        customers.append(item)
+
+    for branch in branches.values():
+        for name in AGING_BUCKETS + ('total',):
+            branch[name] = branch[name] / 100
+    return {
+        'as_of': today.isoformat(),
+        'source': source,
+        'buckets': list(AGING_BUCKETS),
+        'customers': customers,
+        'branches': sorted(branches.values(), key=lambda b: (b['branch_id'] is None, b['branch_id'] or 0)),
+        'totals': {name: value / 100 for name, value in totals.items()}
+    }
+
+
+@reports_bp.route('/reports/aging', methods=['GET'])
+def get_aging_report():
+    """Receivables aging (current, 1-30, 31-60, 61-90, 90+ days past due).
+
+    source=contracts (default) ages contract balances by contract_end_date;
+    source=payment_requests ages unpaid payment requests by due_date.
+    Results are cached for the day; refresh=1 recomputes.
+    """
+    try:
+        source = request.args.get('source', 'contracts')
+        if source not in AGING_SOURCES:
+            return jsonify({'error': f"source must be one of: {', '.join(AGING_SOURCES)}"}), 400
+        today = date.today()
+        key = ('aging', source, today)
+        if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+            aging_cache.invalidate(key)
+        return jsonify(aging_cache.get_or_compute(key, lambda: compute_aging(source, today)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+REVENUE_GRANULARITIES = ('month', 'quarter', 'year')
+REVENUE_GROUPINGS = ('branch', 'contract_type')
+REVENUE_MEASURES = ('contracted', 'invoiced', 'collected')
+
+
+def _parse_month_arg(name):
+    """Read a YYYY-MM (or YYYY-MM-DD) query arg as the first day of that month"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    for fmt in ('%Y-%m', '%Y-%m-%d'):
+        try:
+            return month_start(datetime.strptime(value, fmt).date())
+        except ValueError:
+            continue
+    raise ValueError(f'{name} must be a YYYY-MM month')
+
+
+def _period_label(month, granularity):
+    if granularity == 'year':
+        return f'{month.year}'
+    if granularity == 'quarter':
+        return f'{month.year}-Q{(month.month + 2) // 3}'
+    return f'{month.year}-{month.month:02d}'
+
+
+def _period_column(granularity):
+    month = RevenueMonthly.month
+    if granularity == 'year':
+        return func.strftime('%Y', month)
+    if granularity == 'quarter':
+        quarter = (cast(func.strftime('%m', month), db.Integer) + 2) // 3
+        return func.strftime('%Y', month) + '-Q' + cast(quarter, db.String)
+    return func.strftime('%Y-%m', month)
+
+
+@reports_bp.route('/reports/revenue', methods=['GET'])
+def get_revenue_report():
+    """Contracted, invoiced and collected revenue per period from the revenue_monthly rollup.
+
+    Query args: from/to (YYYY-MM, default the last 12 months), granularity
+    (month, quarter, year), branch_id, contract_type and group_by (branch,
+    contract_type) for a per-period breakdown.
+    """
+    try:
+        granularity = request.args.get('granularity', 'month')
+        if granularity not in REVENUE_GRANULARITIES:
+            return jsonify({'error': f"granularity must be one of: {', '.join(REVENUE_GRANULARITIES)}"}), 400
+        group_by = request.args.get('group_by')
+        if group_by and group_by not in REVENUE_GROUPINGS:
+            return jsonify({'error': f"group_by must be one of: {', '.join(REVENUE_GROUPINGS)}"}), 400
+        try:
+            end = _parse_month_arg('to') or month_start(date.today())
+            start = _parse_month_arg('from') or next_month(date(end.year - 1, end.month, 1))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if start > end:
+            return jsonify({'error': 'from must not be after to'}), 400
+
+        period = _period_column(granularity).label('period')
+        group_column = {'branch': RevenueMonthly.branch_id, 'contract_type': RevenueMonthly.contract_type}.get(group_by)
+        columns = [period] + ([group_column.label('group_key')] if group_column is not None else [])
+        query = select(
+            *columns,
+            *(func.round(func.sum(getattr(RevenueMonthly, name)), 2).label(name) for name in REVENUE_MEASURES)
+        ).where(RevenueMonthly.month >= start, RevenueMonthly.month < next_month(end))
+        branch_id = request.args.get('branch_id', type=int)
+        if branch_id is not None:
+            query = query.where(RevenueMonthly.branch_id == branch_id)
+        contract_type = request.args.get('contract_type')
+        if contract_type:
+            query = query.where(RevenueMonthly.contract_type == contract_type)
+        grouping = [period] + ([group_column] if group_column is not None else [])
+        rows = db.session.execute(query.group_by(*grouping).order_by(*grouping)).all()
+
+        # Every period in the range appears, even when nothing was booked in it
+        series = {}
+        month = start
+        while month <= end:
+            label = _period_label(month, granularity)
+            series.setdefault(label, dict(period=label, **{name: 0.0 for name in REVENUE_MEASURES}))
+            month = next_month(month)
+        for row in rows:
+            entry = series[row.period]
+            for name in REVENUE_MEASURES:
+                entry[name] = round(entry[name] + float(row._mapping[name] or 0), 2)
+            if group_column is not None:
+                entry.setdefault('breakdown', []).append(dict(
+                    {'branch_id' if group_by == 'branch' else 'contract_type': row.group_key},
+                    **{name: float(row._mapping[name] or 0) for name in REVENUE_MEASURES}
+                ))
+        if group_column is not None:
+            for entry in series.values():
+                entry.setdefault('breakdown', [])
+
+        return jsonify({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'granularity': granularity,
+            'group_by': group_by,
+            'series': list(series.values()),
+            'totals': {name: round(sum(e[name] for e in series.values()), 2) for name in REVENUE_MEASURES}
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
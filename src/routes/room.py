@@ -1,26 +1,91 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, abort, current_app
 from src.models.user import db
-from src.models.room import Branch, Room, RoomBooking, RoomAlert, WebRoomBooking
+from src.models.room import Branch, Room, RoomBooking, RoomAlert, WebRoomBooking, Amenity, room_amenities, CLOSED_ROOM_STATUSES
 from src.models.customer import Customer
 from datetime import datetime, date, timedelta
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select, update, insert, func, case
+from sqlalchemy.orm import joinedload, contains_eager
+from src.pagination import InvalidCursor, MAX_PER_PAGE, keyset_paginate, cursor_response, wants_cursor, wants_total, wants_all, next_page_link
+from src.models.fieldsets import Fieldset, InvalidFieldset
+from src.routes.customer import bulk_alert_conditions
+from src.serializers import model_columns, row_dicts, parse_date, date_arg
+from src.aggregates import sum_cents
+from src.cache import TTLCache
+from src.availability import availability_index, BLOCKING_STATUSES
+from src.occupancy import occupancy_timeline, MAX_OCCUPANCY_DAYS
+from src.amenities import amenity_index, sync_room_amenities, normalize_amenity
+from src.jobs.revenue import branch_snapshot, refresh_moved_customers
 
 room_bp = Blueprint('room', __name__)
 
+# Shared by concurrent dashboard polls; dropped on every room, branch or booking write
+room_dashboard_cache = TTLCache()
+
 # Branch routes
+def _current_bookings(today):
+    """Rooms an active booking covers today (the Room.get_current_booking rule), with their booked rent"""
+    return (
+        select(
+            RoomBooking.room_id,
+            func.sum(RoomBooking.monthly_rent).label('monthly_rent')
+        )
+        .where(
+            RoomBooking.status == 'active',
+            RoomBooking.rental_start_date <= today,
+            RoomBooking.rental_end_date >= today
+        )
+        .group_by(RoomBooking.room_id)
+        .subquery('current_bookings')
+    )
+
+def _room_count_columns(current):
+    """Room counts over rooms outer-joined to _current_bookings.
+
+    Every room is exactly one of occupied (has a current booking), out of
+    service (CLOSED_ROOM_STATUSES) or available, the same rule the nightly
+    reconcile writes into Room.is_available.
+    """
+    occupied = current.c.room_id.isnot(None)
+    out_of_service = and_(~occupied, Room.status.in_(CLOSED_ROOM_STATUSES))
+    available = and_(Room.room_id.isnot(None), ~occupied, Room.in_service())
+    return [
+        func.count(Room.room_id).label('total_rooms'),
+        func.coalesce(func.sum(case((available, 1), else_=0)), 0).label('available_rooms'),
+        func.coalesce(func.sum(case((occupied, 1), else_=0)), 0).label('occupied_rooms'),
+        func.coalesce(func.sum(case((out_of_service, 1), else_=0)), 0).label('out_of_service_rooms')
+    ]
+
+def _branch_stats_query(today=None):
+    """Branch columns plus room counts, occupancy and rent figures from one GROUP BY"""
+    current = _current_bookings(today or date.today())
+    occupied = current.c.room_id.isnot(None)
+    return (
+        select(
+            *model_columns(Branch, exclude=('total_rooms',)),
+            *_room_count_columns(current),
+            sum_cents(Room.rental_price).label('potential_rent'),
+            sum_cents(case((occupied, func.coalesce(current.c.monthly_rent, Room.rental_price)), else_=0)).label('revenue_at_rent')
+        )
+        .select_from(Branch)
+        .outerjoin(Room, Room.branch_id == Branch.branch_id)
+        .outerjoin(current, current.c.room_id == Room.room_id)
+        .group_by(Branch.branch_id)
+        .order_by(Branch.branch_id)
+    )
+
+def _branch_item(item):
+    """Finish a branch stats row: money back from cents, occupancy and status label"""
+    item['potential_rent'] = int(item['potential_rent']) / 100
+    item['revenue_at_rent'] = int(item['revenue_at_rent']) / 100
+    item['occupancy_rate'] = round(item['occupied_rooms'] / item['total_rooms'], 4) if item['total_rooms'] else 0.0
+    item['status'] = 'Hoạt động' if item['total_rooms'] > 0 else 'Tạm đóng'
+    return item
+
 @room_bp.route('/branches', methods=['GET'])
 def get_branches():
+    """All branches with room counts, occupancy and revenue-at-rent (one grouped query)"""
     try:
-        branches = Branch.query.all()
-        enriched = []
-        for b in branches:
-            item = b.to_dict()
-            total_rooms = Room.query.filter_by(branch_id=b.branch_id).count()
-            available_rooms = Room.query.filter_by(branch_id=b.branch_id, is_available=True).count()
-            item['total_rooms'] = total_rooms
-            item['available_rooms'] = available_rooms
-            item['status'] = 'Hoạt động' if total_rooms > 0 else 'Tạm đóng'
-            enriched.append(item)
+        enriched = [_branch_item(item) for item in row_dicts(db.session.execute(_branch_stats_query()))]
         return jsonify({
             'branches': enriched,
             'total': len(enriched)
@@ -42,6 +107,7 @@ def create_branch():
         
         db.session.add(branch)
         db.session.commit()
+        room_dashboard_cache.invalidate()
         
         return jsonify(branch.to_dict()), 201
     except Exception as e:
@@ -51,14 +117,10 @@ def create_branch():
 @room_bp.route('/branches/<int:branch_id>', methods=['GET'])
 def get_branch(branch_id):
     try:
-        branch = Branch.query.get_or_404(branch_id)
-        item = branch.to_dict()
-        total_rooms = Room.query.filter_by(branch_id=branch_id).count()
-        available_rooms = Room.query.filter_by(branch_id=branch_id, is_available=True).count()
-        item['total_rooms'] = total_rooms
-        item['available_rooms'] = available_rooms
-        item['status'] = 'Hoạt động' if total_rooms > 0 else 'Tạm đóng'
-        return jsonify(item)
+        rows = row_dicts(db.session.execute(_branch_stats_query().where(Branch.branch_id == branch_id)))
+        if not rows:
+            abort(404)
+        return jsonify(_branch_item(rows[0]))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -75,6 +137,7 @@ def update_branch(branch_id):
         branch.updated_at = datetime.utcnow()
         
         db.session.commit()
+        room_dashboard_cache.invalidate()
         return jsonify(branch.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -84,8 +147,16 @@ def update_branch(branch_id):
 def delete_branch(branch_id):
     try:
         branch = Branch.query.get_or_404(branch_id)
+        # Revenue of this branch's tenants moves to their next latest branch
+        snapshot = branch_snapshot(db.session.scalars(
+            select(RoomBooking.customer_id).join(Room, Room.room_id == RoomBooking.room_id)
+            .where(Room.branch_id == branch_id).distinct()
+        ))
         db.session.delete(branch)
+        refresh_moved_customers(snapshot)
         db.session.commit()
+        room_dashboard_cache.invalidate()
+        amenity_index.remove_branch(branch_id)
         return jsonify({'message': 'Branch deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -102,8 +173,14 @@ def get_rooms():
         status = request.args.get('status', '')
         room_type = request.args.get('room_type', '')
         search = request.args.get('search', '')
+        amenities = _amenity_keys(request.args.get('amenities'))
+        fieldset = Fieldset.from_args(request.args, Room)
         
         query = Room.query
+        if fieldset:
+            query = fieldset.apply(query)
+        else:
+            query = query.options(joinedload(Room.branch))
         
         # Apply filters
         if branch_id:
@@ -122,23 +199,36 @@ def get_rooms():
         if room_type:
             query = query.filter(Room.room_type == room_type)
         
+        if amenities:
+            query = query.filter(Room.room_id.in_(_rooms_with_amenities(amenities, branch_id)))
+        
         if search:
             query = query.filter(
                 or_(
                     Room.room_number.contains(search),
-                    Room.amenities.contains(search)
+                    Room.room_id.in_(_rooms_matching_amenity(search))
                 )
             )
         
+        # Cursor mode: seek on (room_number, room_id) instead of COUNT + OFFSET
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [Room.room_number, Room.room_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=wants_total(request.args)
+            )
+            rooms_list = _room_list(result['items'], fieldset)
+            return jsonify(cursor_response(result, 'rooms', rooms_list)), 200
+        
         # Add ordering for consistent results
-        query = query.order_by(Room.room_number)
+        query = query.order_by(Room.room_number, Room.room_id)
         
         rooms = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
-            'rooms': [room.to_dict(include_bookings=True, include_branch=True) for room in rooms.items],
+            'rooms': _room_list(rooms.items, fieldset),
             'total': rooms.total,
             'pages': rooms.pages,
             'current_page': page,
@@ -147,6 +237,114 @@ def get_rooms():
             'has_prev': rooms.has_prev
         }), 200
         
+    except (InvalidCursor, InvalidFieldset) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _amenity_keys(value):
+    """amenities=wifi,air conditioning -> normalized dictionary keys"""
+    return [normalize_amenity(key) for key in (value or '').split(',') if key.strip()]
+
+def _rooms_with_amenities(keys, branch_id=None):
+    """room_ids having every amenity in keys, from the bitmap index"""
+    amenity_index.ensure_fresh(current_app.config.get('AMENITY_INDEX_MAX_AGE'))
+    return amenity_index.rooms_with(keys, branch_id)
+
+def _rooms_matching_amenity(term):
+    """Subquery of rooms with an amenity containing term, like the old substring search on Room.amenities"""
+    # Links rooms inserted outside the room API before searching them
+    amenity_index.ensure_fresh(current_app.config.get('AMENITY_INDEX_MAX_AGE'))
+    return (
+        select(room_amenities.c.room_id)
+        .join(Amenity, Amenity.amenity_id == room_amenities.c.amenity_id)
+        .where(Amenity.name.contains(normalize_amenity(term), autoescape=True))
+    )
+
+def _room_list(rooms, fieldset=None):
+    """Serialize a page of rooms; current bookings are resolved for the whole page at once"""
+    if not fieldset or 'current_booking' in fieldset.expand:
+        Room.prefetch_current_bookings(rooms)
+    if fieldset:
+        return [fieldset.serialize(room) for room in rooms]
+    return [room.to_dict(include_bookings=True, include_branch=True) for room in rooms]
+
+AVAILABILITY_COLUMNS = (
+    Room.room_id, Room.branch_id, Room.room_number, Room.room_type,
+    Room.area, Room.orientation, Room.rental_price, Room.capacity, Room.amenities, Room.status
+)
+
+@room_bp.route('/rooms/availability', methods=['GET'])
+def get_room_availability():
+    """Rooms free for the whole of [date_from, date_to].
+
+    Optional filters: branch_id, min_capacity, max_price, room_type,
+    amenities (comma separated, all required). Room attributes are filtered in
+    SQL; amenities by the bitmap index and booking overlaps by the in-memory
+    interval index.
+    """
+    try:
+        try:
+            date_from = parse_date(request.args.get('date_from'), 'date_from')
+            date_to = parse_date(request.args.get('date_to'), 'date_to')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if date_to < date_from:
+            return jsonify({'error': 'date_to must not be before date_from'}), 400
+        if date_from < date.today():
+            return jsonify({'error': 'date_from must not be in the past'}), 400
+
+        query = select(*AVAILABILITY_COLUMNS).where(Room.in_service())
+        branch_id = request.args.get('branch_id', type=int)
+        if branch_id:
+            query = query.where(Room.branch_id == branch_id)
+        min_capacity = request.args.get('min_capacity', type=int)
+        if min_capacity:
+            query = query.where(Room.capacity >= min_capacity)
+        max_price = request.args.get('max_price', type=float)
+        if max_price is not None:
+            query = query.where(Room.rental_price <= max_price)
+        room_type = request.args.get('room_type')
+        if room_type:
+            query = query.where(Room.room_type == room_type)
+        amenities = _amenity_keys(request.args.get('amenities'))
+        if amenities:
+            query = query.where(Room.room_id.in_(_rooms_with_amenities(amenities, branch_id)))
+        candidates = db.session.execute(query.order_by(Room.room_number, Room.room_id)).all()
+
+        availability_index.ensure_fresh(current_app.config.get('AVAILABILITY_INDEX_MAX_AGE'))
+        free = set(availability_index.free_rooms([row.room_id for row in candidates], date_from, date_to))
+        rooms = [row for row in candidates if row.room_id in free]
+        return jsonify({
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'rooms': rooms,
+            'total': len(rooms),
+            'candidates': len(candidates),
+            'index': availability_index.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@room_bp.route('/rooms/occupancy', methods=['GET'])
+def get_room_occupancy():
+    """Occupancy heatmap: day-by-room matrix plus daily occupancy and revenue-at-rent per branch.
+
+    Query args: from/to (YYYY-MM-DD, default the last 30 days), branch_id,
+    matrix=0 to return only the per-branch series.
+    """
+    try:
+        try:
+            date_to = date_arg('to', date.today())
+            date_from = date_arg('from', date_to - timedelta(days=29))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if date_to < date_from:
+            return jsonify({'error': 'to must not be before from'}), 400
+        if (date_to - date_from).days + 1 > MAX_OCCUPANCY_DAYS:
+            return jsonify({'error': f'At most {MAX_OCCUPANCY_DAYS} days per request'}), 400
+        include_matrix = request.args.get('matrix', '1').lower() not in ('0', 'false', 'no')
+        return jsonify(occupancy_timeline(date_from, date_to, request.args.get('branch_id', type=int), include_matrix))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -168,7 +366,11 @@ def create_room():
         )
         
         db.session.add(room)
+        db.session.flush()
+        keys = sync_room_amenities({room.room_id: room.amenities})
         db.session.commit()
+        room_dashboard_cache.invalidate()
+        amenity_index.update_room(room.room_id, room.branch_id, keys.get(room.room_id, ()))
         
         return jsonify(room.to_dict()), 201
     except Exception as e:
@@ -178,8 +380,14 @@ def create_room():
 @room_bp.route('/rooms/<int:room_id>', methods=['GET'])
 def get_room(room_id):
     try:
+        fieldset = Fieldset.from_args(request.args, Room)
+        if fieldset:
+            room = fieldset.apply(Room.query).filter(Room.room_id == room_id).first_or_404()
+            return jsonify(fieldset.serialize(room))
         room = Room.query.get_or_404(room_id)
         return jsonify(room.to_dict())
+    except InvalidFieldset as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -199,7 +407,13 @@ def update_room(room_id):
         room.is_available = data.get('is_available', room.is_available)
         room.updated_at = datetime.utcnow()
         
+        keys = None
+        if 'amenities' in data:
+            keys = sync_room_amenities({room.room_id: room.amenities})[room.room_id]
         db.session.commit()
+        room_dashboard_cache.invalidate()
+        if keys is not None:
+            amenity_index.update_room(room.room_id, room.branch_id, keys)
         return jsonify(room.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -209,14 +423,75 @@ def update_room(room_id):
 def delete_room(room_id):
     try:
         room = Room.query.get_or_404(room_id)
+        snapshot = branch_snapshot(db.session.scalars(
+            select(RoomBooking.customer_id).where(RoomBooking.room_id == room_id).distinct()
+        ))
         db.session.delete(room)
+        refresh_moved_customers(snapshot)
         db.session.commit()
+        room_dashboard_cache.invalidate()
+        availability_index.remove_room(room_id)
+        amenity_index.remove_room(room_id)
         return jsonify({'message': 'Room deleted successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@room_bp.route('/amenities', methods=['GET'])
+def get_amenities():
+    """Amenity dictionary with the number of rooms offering each one"""
+    try:
+        rows = db.session.execute(
+            select(Amenity.amenity_id, Amenity.name, Amenity.label, func.count(room_amenities.c.room_id).label('rooms'))
+            .outerjoin(room_amenities, room_amenities.c.amenity_id == Amenity.amenity_id)
+            .group_by(Amenity.amenity_id)
+            .order_by(Amenity.name)
+        ).all()
+        return jsonify({'amenities': rows, 'total': len(rows)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Room Booking routes
+MAX_BATCH_BOOKINGS = 500
+
+class BookingConflict(Exception):
+    """The requested dates overlap an existing active booking of the same room"""
+
+    def __init__(self, conflicts):
+        super().__init__('Room is already booked for these dates')
+        self.conflicts = conflicts
+
+def claim_rooms(room_ids):
+    """Take the write lock on the rooms before checking for conflicts.
+
+    A no-op UPDATE makes SQLite take its write lock (row locks elsewhere), so a
+    concurrent booking of the same room waits for this transaction and then
+    sees its booking. Returns the ids of the rooms that exist.
+    """
+    room_ids = set(room_ids)
+    db.session.execute(
+        update(Room).where(Room.room_id.in_(room_ids)).values(is_available=Room.is_available)
+        .execution_options(synchronize_session=False)
+    )
+    return set(db.session.scalars(select(Room.room_id).where(Room.room_id.in_(room_ids))))
+
+def find_booking_conflicts(room_id, start_date, end_date, exclude_booking_id=None):
+    """Active bookings of the room overlapping [start_date, end_date] (idx_room_bookings_conflict)"""
+    query = select(
+        RoomBooking.booking_id, RoomBooking.room_id, RoomBooking.rental_start_date, RoomBooking.rental_end_date
+    ).where(
+        RoomBooking.room_id == room_id,
+        RoomBooking.status.in_(BLOCKING_STATUSES),
+        RoomBooking.rental_start_date <= end_date,
+        RoomBooking.rental_end_date >= start_date
+    )
+    if exclude_booking_id is not None:
+        query = query.where(RoomBooking.booking_id != exclude_booking_id)
+    return row_dicts(db.session.execute(query))
+
+def _conflict_response(e):
+    return jsonify({'error': str(e), 'conflicts': e.conflicts}), 409
+
 @room_bp.route('/room-bookings', methods=['GET'])
 def get_room_bookings():
     try:
@@ -224,25 +499,40 @@ def get_room_bookings():
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         branch_id = request.args.get('branch_id', type=int)
+        fieldset = Fieldset.from_args(request.args, RoomBooking)
         
         query = RoomBooking.query.join(Room)
         
+        if fieldset:
+            query = fieldset.apply(query)
+        
         if status:
             query = query.filter(RoomBooking.status == status)
         
         if branch_id:
             query = query.filter(Room.branch_id == branch_id)
         
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [RoomBooking.booking_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=wants_total(request.args)
+            )
+            bookings_list = [fieldset.serialize(b) if fieldset else b.to_dict() for b in result['items']]
+            return jsonify(cursor_response(result, 'bookings', bookings_list))
+        
         bookings = query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
-            'bookings': [booking.to_dict() for booking in bookings.items],
+            'bookings': [fieldset.serialize(b) if fieldset else b.to_dict() for b in bookings.items],
             'total': bookings.total,
             'pages': bookings.pages,
             'current_page': page
         })
+    except (InvalidCursor, InvalidFieldset) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -262,7 +552,17 @@ def create_room_booking():
             deposit_amount=data.get('deposit_amount'),
             notes=data.get('notes')
         )
+        if booking.rental_end_date < booking.rental_start_date:
+            return jsonify({'error': 'rental_end_date must not be before rental_start_date'}), 400
         
+        # Check for double-booking while holding the room's write lock
+        if booking.status in BLOCKING_STATUSES:
+            claim_rooms([booking.room_id])
+            conflicts = find_booking_conflicts(booking.room_id, booking.rental_start_date, booking.rental_end_date)
+            if conflicts:
+                raise BookingConflict(conflicts)
+        
+        snapshot = branch_snapshot([booking.customer_id])
         db.session.add(booking)
         
         # Update room availability
@@ -270,12 +570,129 @@ def create_room_booking():
         if room:
             room.is_available = False
         
-        db.session.commit()
+        # Alerts are written in the same transaction as the booking
+        generate_room_alerts([booking])
+        refresh_moved_customers(snapshot)
         
-        # Generate alerts for this booking
-        generate_room_alerts(booking)
+        db.session.commit()
+        room_dashboard_cache.invalidate()
+        availability_index.add_booking(booking)
         
         return jsonify(booking.to_dict()), 201
+    except BookingConflict as e:
+        db.session.rollback()
+        return _conflict_response(e)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _parse_booking(data):
+    """Normalize one booking payload into an insertable row; raises ValueError"""
+    row = {}
+    for name in ('room_id', 'customer_id'):
+        try:
+            row[name] = int(data.get(name))
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} is required')
+    for name in ('rental_start_date', 'rental_end_date', 'contract_signed_date'):
+        value = data.get(name)
+        if not value:
+            if name != 'contract_signed_date':
+                raise ValueError(f'{name} is required')
+            row[name] = None
+            continue
+        row[name] = parse_date(value, name)
+    if row['rental_end_date'] < row['rental_start_date']:
+        raise ValueError('rental_end_date must not be before rental_start_date')
+    row['status'] = data.get('status', 'active')
+    for name in ('monthly_rent', 'deposit_amount', 'notes'):
+        row[name] = data.get(name)
+    return row
+
+@room_bp.route('/room-bookings/batch', methods=['POST'])
+def create_room_bookings_batch():
+    """Book many rooms at once: {"bookings": [{room_id, customer_id, rental_start_date, ...}]}.
+
+    All-or-nothing: validation errors and date conflicts (with existing
+    bookings or within the batch) are reported per index and nothing is saved.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('bookings')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Missing or invalid bookings array'}), 400
+        if len(items) > MAX_BATCH_BOOKINGS:
+            return jsonify({'error': f'At most {MAX_BATCH_BOOKINGS} bookings per batch'}), 400
+
+        rows, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                rows.append(_parse_booking(item if isinstance(item, dict) else {}))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+        if errors:
+            return jsonify({'error': 'Invalid bookings', 'errors': errors}), 400
+
+        # Lock every room in the batch, then check all of them with one query
+        existing_rooms = claim_rooms(row['room_id'] for row in rows)
+        blocking = [(index, row) for index, row in enumerate(rows) if row['status'] in BLOCKING_STATUSES]
+        taken = {}
+        if blocking:
+            for booking in row_dicts(db.session.execute(
+                select(RoomBooking.booking_id, RoomBooking.room_id, RoomBooking.rental_start_date, RoomBooking.rental_end_date)
+                .where(
+                    RoomBooking.room_id.in_({row['room_id'] for _, row in blocking}),
+                    RoomBooking.status.in_(BLOCKING_STATUSES),
+                    RoomBooking.rental_start_date <= max(row['rental_end_date'] for _, row in blocking),
+                    RoomBooking.rental_end_date >= min(row['rental_start_date'] for _, row in blocking)
+                )
+            )):
+                taken.setdefault(booking['room_id'], []).append(booking)
+
+        for index, row in enumerate(rows):
+            if row['room_id'] not in existing_rooms:
+                errors.append({'index': index, 'error': f"room {row['room_id']} does not exist"})
+        for index, row in blocking:
+            conflicts = [
+                b for b in taken.get(row['room_id'], [])
+                if b['rental_start_date'] <= row['rental_end_date'] and b['rental_end_date'] >= row['rental_start_date']
+            ]
+            if conflicts:
+                errors.append({'index': index, 'error': 'Room is already booked for these dates', 'conflicts': conflicts})
+            # Later rows in the batch must not overlap this one either
+            taken.setdefault(row['room_id'], []).append({
+                'booking_id': None, 'batch_index': index, 'room_id': row['room_id'],
+                'rental_start_date': row['rental_start_date'], 'rental_end_date': row['rental_end_date']
+            })
+        if errors:
+            db.session.rollback()
+            status = 409 if all('conflicts' in e for e in errors) else 400
+            return jsonify({'error': 'Bookings rejected', 'errors': sorted(errors, key=lambda e: e['index'])}), status
+
+        snapshot = branch_snapshot(row['customer_id'] for row in rows)
+        inserted = db.session.execute(
+            insert(RoomBooking).returning(
+                RoomBooking.booking_id, RoomBooking.room_id, RoomBooking.status,
+                RoomBooking.rental_start_date, RoomBooking.rental_end_date,
+                sort_by_parameter_order=True
+            ),
+            rows
+        ).all()
+        db.session.execute(
+            update(Room).where(Room.room_id.in_({row['room_id'] for _, row in blocking})).values(is_available=False)
+        )
+        alerts_created = generate_room_alerts(inserted)
+        refresh_moved_customers(snapshot)
+        db.session.commit()
+        room_dashboard_cache.invalidate()
+        for booking in inserted:
+            availability_index.add_booking(booking)
+        return jsonify({
+            'message': 'Room bookings created',
+            'created': len(inserted),
+            'booking_ids': [booking.booking_id for booking in inserted],
+            'alerts_created': alerts_created
+        }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -285,8 +702,10 @@ def update_room_booking(booking_id):
     try:
         booking = RoomBooking.query.get_or_404(booking_id)
         data = request.get_json()
+        snapshot = branch_snapshot([booking.customer_id])
         
         old_status = booking.status
+        old_dates = (booking.rental_start_date, booking.rental_end_date)
         
         booking.rental_start_date = datetime.strptime(data['rental_start_date'], '%Y-%m-%d').date() if data.get('rental_start_date') else booking.rental_start_date
         booking.rental_end_date = datetime.strptime(data['rental_end_date'], '%Y-%m-%d').date() if data.get('rental_end_date') else booking.rental_end_date
@@ -296,6 +715,21 @@ def update_room_booking(booking_id):
         booking.deposit_amount = data.get('deposit_amount', booking.deposit_amount)
         booking.notes = data.get('notes', booking.notes)
         booking.updated_at = datetime.utcnow()
+        if booking.rental_end_date < booking.rental_start_date:
+            db.session.rollback()
+            return jsonify({'error': 'rental_end_date must not be before rental_start_date'}), 400
+        
+        # Moving or re-activating a booking must not overlap another active one
+        if booking.status in BLOCKING_STATUSES and (
+            old_status != booking.status or old_dates != (booking.rental_start_date, booking.rental_end_date)
+        ):
+            claim_rooms([booking.room_id])
+            conflicts = find_booking_conflicts(
+                booking.room_id, booking.rental_start_date, booking.rental_end_date,
+                exclude_booking_id=booking.booking_id
+            )
+            if conflicts:
+                raise BookingConflict(conflicts)
         
         # Update room availability if status changed
         if old_status != booking.status:
@@ -306,8 +740,14 @@ def update_room_booking(booking_id):
                 else:
                     room.is_available = False
         
+        refresh_moved_customers(snapshot)
         db.session.commit()
+        room_dashboard_cache.invalidate()
+        availability_index.add_booking(booking)
         return jsonify(booking.to_dict())
+    except BookingConflict as e:
+        db.session.rollback()
+        return _conflict_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -316,6 +756,7 @@ def update_room_booking(booking_id):
 def delete_room_booking(booking_id):
     try:
         booking = RoomBooking.query.get_or_404(booking_id)
+        snapshot = branch_snapshot([booking.customer_id])
         
         # Make room available again
         room = Room.query.get(booking.room_id)
@@ -323,64 +764,181 @@ def delete_room_booking(booking_id):
             room.is_available = True
         
         db.session.delete(booking)
+        refresh_moved_customers(snapshot)
         db.session.commit()
+        room_dashboard_cache.invalidate()
+        availability_index.remove_booking(booking_id)
         return jsonify({'message': 'Room booking deleted successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 # Room Dashboard and Statistics
+def _room_dashboard_queries(today):
+    """Room figures per branch and active-booking figures per branch: two GROUP BYs"""
+    current = _current_bookings(today)
+    rooms = (
+        select(Branch.branch_id, Branch.branch_name, *_room_count_columns(current))
+        .select_from(Branch)
+        .outerjoin(Room, Room.branch_id == Branch.branch_id)
+        .outerjoin(current, current.c.room_id == Room.room_id)
+        .group_by(Branch.branch_id)
+        .order_by(Branch.branch_id)
+    )
+    bookings = (
+        select(
+            Room.branch_id,
+            func.count().label('active_bookings'),
+            func.sum(case((RoomBooking.rental_end_date.between(today, today + timedelta(days=30)), 1), else_=0)).label('expiring_soon'),
+            func.sum(case((RoomBooking.rental_end_date < today, 1), else_=0)).label('overdue_bookings')
+        )
+        .join(Room, Room.room_id == RoomBooking.room_id)
+        .where(RoomBooking.status == 'active')
+        .group_by(Room.branch_id)
+    )
+    return rooms, bookings
+
+def _occupancy_rate(occupied, total):
+    return round((occupied / total * 100) if total > 0 else 0, 1)
+
+def _compute_room_dashboard_stats():
+    rooms_query, bookings_query = _room_dashboard_queries(date.today())
+    branches = row_dicts(db.session.execute(rooms_query))
+    booking_counts = {row.branch_id: row for row in db.session.execute(bookings_query)}
+    booking_fields = ('active_bookings', 'expiring_soon', 'overdue_bookings')
+    for branch in branches:
+        counts = booking_counts.get(branch['branch_id'])
+        for field in booking_fields:
+            branch[field] = int(getattr(counts, field) or 0) if counts else 0
+        branch['occupancy_rate'] = _occupancy_rate(branch['occupied_rooms'], branch['total_rooms'])
+
+    stats = {'total_branches': len(branches)}
+    for field in ('total_rooms', 'occupied_rooms', 'available_rooms', 'out_of_service_rooms'):
+        stats[field] = sum(branch[field] for branch in branches)
+    # Bookings on rooms of every branch, including any whose branch row is gone
+    for field in booking_fields:
+        stats[field] = sum(int(getattr(row, field) or 0) for row in booking_counts.values())
+    stats['occupancy_rate'] = _occupancy_rate(stats['occupied_rooms'], stats['total_rooms'])
+    stats['branches'] = branches
+    return stats
+
 @room_bp.route('/room-dashboard/stats', methods=['GET'])
 def get_room_dashboard_stats():
+    """Room and booking figures, totals plus per branch (cached for DASHBOARD_CACHE_TTL seconds)"""
     try:
-        total_branches = Branch.query.count()
-        total_rooms = Room.query.count()
-        occupied_rooms = Room.query.filter(Room.is_available == False).count()
-        available_rooms = Room.query.filter(Room.is_available == True).count()
-        
-        active_bookings = RoomBooking.query.filter(RoomBooking.status == 'active').count()
-        
-        # Rooms expiring soon (within 30 days)
-        thirty_days_from_now = date.today() + timedelta(days=30)
-        expiring_soon = RoomBooking.query.filter(
-            RoomBooking.rental_end_date <= thirty_days_from_now,
-            RoomBooking.rental_end_date >= date.today(),
-            RoomBooking.status == 'active'
-        ).count()
-        
-        # Overdue bookings
-        overdue_bookings = RoomBooking.query.filter(
-            RoomBooking.rental_end_date < date.today(),
-            RoomBooking.status == 'active'
-        ).count()
-        
-        return jsonify({
-            'total_branches': total_branches,
-            'total_rooms': total_rooms,
-            'occupied_rooms': occupied_rooms,
-            'available_rooms': available_rooms,
-            'active_bookings': active_bookings,
-            'expiring_soon': expiring_soon,
-            'overdue_bookings': overdue_bookings,
-            'occupancy_rate': round((occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0, 1)
-        })
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 10)
+        return jsonify(room_dashboard_cache.get_or_compute('room_dashboard_stats', _compute_room_dashboard_stats, ttl=ttl))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Room Alerts
 @room_bp.route('/room-alerts/upcoming', methods=['GET'])
 def get_upcoming_room_alerts():
+    """Get upcoming room alerts.
+
+    Optional filters: date_from / date_to (YYYY-MM-DD, date_from defaults to
+    today), branch_id and alert_type (comma separated). Passing page/per_page
+    or cursor returns a paginated envelope. Otherwise the legacy plain array is
+    returned, capped at MAX_PER_PAGE alerts with a Link header (rel="next") to
+    the following cursor page; ?all=1 returns every alert.
+    """
     try:
-        today = date.today()
-        upcoming_alerts = RoomAlert.query.filter(
-            RoomAlert.alert_date >= today,
-            RoomAlert.is_sent == False
-        ).order_by(RoomAlert.alert_date).all()
+        date_from = date_arg('date_from', date.today())
+        date_to = date_arg('date_to')
+        branch_id = request.args.get('branch_id', type=int)
+        alert_types = [t for t in request.args.get('alert_type', '').split(',') if t]
+        fieldset = Fieldset.from_args(request.args, RoomAlert)
+        
+        # Served by the (is_sent, alert_date) index
+        query = RoomAlert.query.filter(
+            RoomAlert.is_sent == False,
+            RoomAlert.alert_date >= date_from
+        )
+        if date_to:
+            query = query.filter(RoomAlert.alert_date <= date_to)
+        if alert_types:
+            query = query.filter(RoomAlert.alert_type.in_(alert_types))
+        
+        if fieldset:
+            if branch_id:
+                query = query.join(RoomAlert.booking).join(RoomBooking.room).filter(Room.branch_id == branch_id)
+            query = fieldset.apply(query)
+            serialize = fieldset.serialize
+        else:
+            # Alert, booking, room, branch and customer summary in one joined SELECT
+            query = query.join(RoomAlert.booking).join(RoomBooking.room).join(Room.branch).join(RoomBooking.customer).options(
+                contains_eager(RoomAlert.booking).contains_eager(RoomBooking.room).contains_eager(Room.branch),
+                contains_eager(RoomAlert.booking).contains_eager(RoomBooking.customer)
+            )
+            if branch_id:
+                query = query.filter(Room.branch_id == branch_id)
+            serialize = _upcoming_room_alert_item
+        
+        per_page = min(request.args.get('per_page', 50, type=int), 100)  # Limit max 100
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [RoomAlert.alert_date, RoomAlert.alert_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                with_total=wants_total(request.args)
+            )
+            return jsonify(cursor_response(result, 'alerts', [serialize(a) for a in result['items']]))
+        
+        query = query.order_by(RoomAlert.alert_date, RoomAlert.alert_id)
+        if 'page' in request.args or 'per_page' in request.args:
+            page = request.args.get('page', 1, type=int)
+            alerts = query.paginate(page=page, per_page=per_page, error_out=False)
+            return jsonify({
+                'alerts': [serialize(a) for a in alerts.items],
+                'total': alerts.total,
+                'pages': alerts.pages,
+                'current_page': page,
+                'per_page': per_page,
+                'has_next': alerts.has_next,
+                'has_prev': alerts.has_prev
+            })
+        if wants_all(request.args):
+            return jsonify([serialize(a) for a in query.all()])
         
-        return jsonify([alert.to_dict() for alert in upcoming_alerts])
+        # Legacy plain array, first page only
+        result = keyset_paginate(query, [RoomAlert.alert_date, RoomAlert.alert_id], per_page=MAX_PER_PAGE)
+        response = jsonify([serialize(a) for a in result['items']])
+        link = next_page_link(result)
+        if link:
+            response.headers['Link'] = link
+        return response
+    except (InvalidCursor, InvalidFieldset, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _upcoming_room_alert_item(alert):
+    """Alert with a booking, room, branch and customer summary (relations already loaded)"""
+    item = alert.to_dict()
+    booking = alert.booking
+    room = booking.room
+    customer = booking.customer
+    item['booking'] = {
+        'booking_id': booking.booking_id,
+        'rental_start_date': booking.rental_start_date.isoformat() if booking.rental_start_date else None,
+        'rental_end_date': booking.rental_end_date.isoformat() if booking.rental_end_date else None,
+        'status': booking.status,
+        'monthly_rent': float(booking.monthly_rent) if booking.monthly_rent else None
+    }
+    item['room'] = {
+        'room_id': room.room_id,
+        'room_number': room.room_number,
+        'branch_id': room.branch_id,
+        'branch_name': room.branch.branch_name
+    }
+    item['customer'] = {
+        'customer_id': customer.customer_id,
+        'customer_name': customer.customer_name,
+        'company_name': customer.company_name,
+        'email': customer.email,
+        'mobile': customer.mobile
+    }
+    return item
+
 @room_bp.route('/room-alerts/<int:alert_id>/mark_sent', methods=['POST'])
 def mark_room_alert_as_sent(alert_id):
     try:
@@ -392,6 +950,33 @@ def mark_room_alert_as_sent(alert_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@room_bp.route('/room-alerts/mark_sent', methods=['POST'])
+def bulk_mark_room_alerts_sent():
+    """Mark many room alerts as sent with one UPDATE.
+
+    Body: {"alert_ids": [...]} or {"filter": {"date_to": "YYYY-MM-DD",
+    "date_from": ..., "alert_type": "a,b", "branch_id": n}}.
+    """
+    try:
+        data = request.get_json() or {}
+        conditions = bulk_alert_conditions(RoomAlert, data, {
+            'branch_id': lambda value: RoomAlert.booking_id.in_(
+                select(RoomBooking.booking_id).join(Room, Room.room_id == RoomBooking.room_id)
+                .where(Room.branch_id == int(value))
+            )
+        })
+        result = db.session.execute(
+            update(RoomAlert).where(*conditions).values(is_sent=True)
+        )
+        db.session.commit()
+        return jsonify({'message': 'Alerts marked as sent', 'updated': result.rowcount})
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # Web Room Bookings (from website)
 @room_bp.route('/web-room-bookings', methods=['GET'])
 def get_web_room_bookings():
@@ -399,22 +984,39 @@ def get_web_room_bookings():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
+        fieldset = Fieldset.from_args(request.args, WebRoomBooking)
         
         query = WebRoomBooking.query
         
+        if fieldset:
+            query = fieldset.apply(query)
+        
         if status:
             query = query.filter(WebRoomBooking.status == status)
         
+        # Cursor mode orders newest first by id; booking_date defaults to the
+        # insert time so the order matches, and the primary key is never NULL
+        if wants_cursor(request.args):
+            result = keyset_paginate(
+                query, [WebRoomBooking.web_booking_id],
+                cursor=request.args.get('cursor'), per_page=per_page,
+                descending=True, with_total=wants_total(request.args)
+            )
+            bookings_list = [fieldset.serialize(b) if fieldset else b.to_dict() for b in result['items']]
+            return jsonify(cursor_response(result, 'bookings', bookings_list))
+        
         bookings = query.order_by(WebRoomBooking.booking_date.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
-            'bookings': [booking.to_dict() for booking in bookings.items],
+            'bookings': [fieldset.serialize(b) if fieldset else b.to_dict() for b in bookings.items],
             'total': bookings.total,
             'pages': bookings.pages,
             'current_page': page
         })
+    except (InvalidCursor, InvalidFieldset) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -443,68 +1045,58 @@ def create_web_room_booking():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-def generate_room_alerts(booking):
-    """Generate alerts for room booking expiration"""
-    try:
-        alerts_to_create = []
-        end_date = booking.rental_end_date
-        
-        # 20 days before for 30-day contracts
-        contract_duration = (booking.rental_end_date - booking.rental_start_date).days
-        if contract_duration <= 30:
-            alert_date = end_date - timedelta(days=20)
-            if alert_date >= date.today():
-                alerts_to_create.append(RoomAlert(
-                    booking_id=booking.booking_id,
-                    alert_date=alert_date,
-                    alert_type='20_days_before_30_day_contract'
-                ))
-        
-        # 2 weeks before
-        alert_date = end_date - timedelta(days=14)
-        if alert_date >= date.today():
-            alerts_to_create.append(RoomAlert(
-                booking_id=booking.booking_id,
-                alert_date=alert_date,
-                alert_type='2_weeks_before'
-            ))
-        
-        # 1 week before
-        alert_date = end_date - timedelta(days=7)
-        if alert_date >= date.today():
-            alerts_to_create.append(RoomAlert(
-                booking_id=booking.booking_id,
-                alert_date=alert_date,
-                alert_type='1_week_before'
-            ))
-        
-        # Due date
-        alerts_to_create.append(RoomAlert(
-            booking_id=booking.booking_id,
-            alert_date=end_date,
-            alert_type='due_date'
-        ))
-        
-        # 3 days overdue
-        alert_date = end_date + timedelta(days=3)
-        alerts_to_create.append(RoomAlert(
-            booking_id=booking.booking_id,
-            alert_date=alert_date,
-            alert_type='3_days_overdue'
-        ))
-        
-        # 7 days overdue
-        alert_date = end_date + timedelta(days=7)
-        alerts_to_create.append(RoomAlert(
-            booking_id=booking.booking_id,
-            alert_date=alert_date,
-            alert_type='7_days_overdue'
-        ))
-        
-        for alert in alerts_to_create:
-            db.session.add(alert)
-        
-        db.session.commit()
-    except Exception as e:
-        print(f"Error generating room alerts: {e}")
-        db.session.rollback() 
\ No newline at end of file
+# (alert_type, days relative to rental_end_date, only if the date is still ahead,
+#  only for bookings lasting at most this many days)
+ROOM_ALERT_RULES = [
+    ('20_days_before_30_day_contract', -20, True, 30),
+    ('2_weeks_before', -14, True, None),
+    ('1_week_before', -7, True, None),
+    ('due_date', 0, False, None),
+    ('3_days_overdue', 3, False, None),
+    ('7_days_overdue', 7, False, None)
+]
+
+ROOM_ALERT_LOOKUP_SIZE = 500  # booking ids per existing-alert lookup when skip_existing
+
+def room_alert_rows(booking_id, start_date, end_date, today=None):
+    """Alert rows (plain dicts) a booking should have"""
+    today = today or date.today()
+    duration = (end_date - start_date).days
+    rows = []
+    for alert_type, offset_days, future_only, max_duration in ROOM_ALERT_RULES:
+        if max_duration is not None and duration > max_duration:
+            continue
+        alert_date = end_date + timedelta(days=offset_days)
+        if future_only and alert_date < today:
+            continue
+        rows.append({
+            'booking_id': booking_id,
+            'alert_date': alert_date,
+            'alert_type': alert_type
+        })
+    return rows
+
+def generate_room_alerts(bookings, today=None, skip_existing=False):
+    """Bulk-insert the alerts of many bookings inside the caller's transaction (no commit).
+
+    `bookings` are RoomBooking instances or rows with booking_id,
+    rental_start_date and rental_end_date. For backfills over existing
+    bookings, skip_existing leaves out alerts a booking already has (same type
+    and date). Returns the number of alerts inserted.
+    """
+    db.session.flush()  # new RoomBooking instances need their ids
+    rows = []
+    for booking in bookings:
+        rows.extend(room_alert_rows(booking.booking_id, booking.rental_start_date, booking.rental_end_date, today))
+    if rows and skip_existing:
+        booking_ids = list({row['booking_id'] for row in rows})
+        existing = set()
+        for offset in range(0, len(booking_ids), ROOM_ALERT_LOOKUP_SIZE):
+            existing.update(db.session.execute(
+                select(RoomAlert.booking_id, RoomAlert.alert_type, RoomAlert.alert_date)
+                .where(RoomAlert.booking_id.in_(booking_ids[offset:offset + ROOM_ALERT_LOOKUP_SIZE]))
+            ).all())
+        rows = [row for row in rows if (row['booking_id'], row['alert_type'], row['alert_date']) not in existing]
+    if rows:
+        db.session.execute(insert(RoomAlert), rows)
+    return len(rows)
@@ -0,0 +1,124 @@
+"""JSON encoding for API responses.
+
+AppJSONProvider lets jsonify() take Decimal, date and datetime values and
+SQLAlchemy Core rows as they come out of the database, so list endpoints can
+hand their result rows straight to the response instead of building ORM
+instances and to_dict() copies. orjson (requirements.txt) writes the response
+bytes; the standard library is the fallback when it is not installed.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def json_value(value):
+    """Decimal as float and dates as ISO 8601, like the models' to_dict(); anything else unchanged"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _default(value):
+    if isinstance(value, Row):
+        return dict(zip(value._fields, value))
+    converted = json_value(value)
+    if converted is value:
+        raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+    return converted
+
+
+def _expand_rows(obj):
+    """Lists of Core rows (the payload itself or its top-level values) as objects.
+
+    orjson only writes JSON objects from dicts and calls back into Python for
+    every value it cannot encode, so each list is mapped once with the row
+    keys looked up a single time; a default() callback per row is twice as slow.
+    """
+    if isinstance(obj, list) and obj and isinstance(obj[0], Row):
+        keys = obj[0]._fields
+        return [dict(zip(keys, row)) for row in obj]
+    if isinstance(obj, dict):
+        return {key: _expand_rows(value) if isinstance(value, list) else value for key, value in obj.items()}
+    return obj
+
+
+def parse_date(value, name):
+    """A YYYY-MM-DD string as a date; ValueError naming the field otherwise"""
+    try:
+        return datetime.strptime(str(value).strip(), '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+
+def date_arg(name, default=None):
+    """Optional YYYY-MM-DD query argument"""
+    value = request.args.get(name)
+    return parse_date(value, name) if value else default
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    """Encodes Decimal as a number, dates as ISO 8601 (matching the models' to_dict()) and Core rows as objects"""
+
+    _ORJSON_KWARGS = frozenset(('indent', 'separators', 'sort_keys', 'ensure_ascii'))
+
+    def _orjson_option(self, indent=None, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Flask always passes indent or separators; orjson output is compact
+        # (separators) or 2-space indented, and always UTF-8 (ensure_ascii)
+        if orjson is not None and kwargs.keys() <= self._ORJSON_KWARGS:
+            option = self._orjson_option(kwargs.get('indent'), kwargs.get('sort_keys'))
+            return orjson.dumps(_expand_rows(obj), default=_default, option=option).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """jsonify(): orjson bytes go straight into the response body, no str round trip"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._orjson_option(indent) | orjson.OPT_APPEND_NEWLINE
+        body = orjson.dumps(_expand_rows(obj), default=_default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def row_dicts(rows, keys=None):
+    """Plain dicts for Core result rows that a route adds keys to before responding.
+
+    Rows that go to the response unchanged need no conversion: jsonify() takes them as they are.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    keys = keys or rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def model_columns(model, exclude=()):
+    """The model's table columns (optionally minus some) for a Core select"""
+    return [column for column in model.__table__.columns if column.key not in exclude]
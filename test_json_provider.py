@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+# Thêm đường dẫn để import src
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.serializers import AppJSONProvider
+
+orjson = pytest.importorskip('orjson')
+
+
+def _app():
+    app = Flask(__name__)
+    app.json = AppJSONProvider(app)
+    return app
+
+
+def _rows():
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT 1 AS customer_id, 'Nguyễn Văn A' AS customer_name")).all()
+
+
+def test_jsonify_uses_orjson():
+    """jsonify() phải đi qua orjson, kể cả khi Flask truyền separators/indent"""
+    app = _app()
+    payload = {'amount': Decimal('1200.50'), 'day': date(2026, 3, 15), 'at': datetime(2026, 3, 15, 9, 30)}
+    with app.app_context(), mock.patch('orjson.dumps', wraps=orjson.dumps) as dumps:
+        response = jsonify(payload)
+    assert dumps.called
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'amount': 1200.5, 'day': '2026-03-15', 'at': '2026-03-15T09:30:00'}
+
+
+def test_jsonify_indents_in_debug():
+    app = _app()
+    app.debug = True
+    with app.app_context():
+        body = jsonify({'b': 1, 'a': [1]}).get_data(as_text=True)
+    assert body == '{\n  "a": [\n    1\n  ],\n  "b": 1\n}\n'
+
+
+def test_jsonify_encodes_core_rows():
+    """Core rows đi thẳng vào jsonify(), không cần row_dicts()"""
+    app = _app()
+    with app.app_context():
+        response = jsonify({'customers': _rows()})
+    assert response.get_json() == {'customers': [{'customer_id': 1, 'customer_name': 'Nguyễn Văn A'}]}
+
+
+def test_dumps_translates_flask_kwargs():
+    app = _app()
+    with mock.patch('orjson.dumps', wraps=orjson.dumps) as dumps:
+        assert app.json.dumps({'b': 1, 'a': 2}, separators=(',', ':')) == '{"a":2,"b":1}'
+        assert app.json.dumps([1], indent=2) == '[\n  1\n]'
+    assert dumps.call_count == 2
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-q']))